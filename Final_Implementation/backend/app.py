@@ -1,56 +1,153 @@
-from flask import Flask, request, jsonify, render_template, redirect, url_for, session
+from flask import Blueprint, Flask, Response, current_app, g, request, jsonify, render_template, redirect, url_for, session, stream_with_context
 from flask_cors import CORS
 from functools import wraps
-import jwt
 from datetime import datetime, timedelta
 import os
 from dotenv import load_dotenv
 import csv
-from cryptography.fernet import Fernet
+import json
+import logging
+import threading
+import time
 from pathlib import Path
+from auth import init_db
+from vault import init_vault, evict_cipher, warm_cipher, cipher_cache_stats, get_credentials_page, iter_credentials, get_changes_since
+from db_pool import start_compactor, pool_stats, compactor_stats
+from credential_store import (
+    get_user_id,
+    find_credentials,
+    find_credentials_batch,
+    find_credentials_versioned,
+    find_credential,
+    credential_id,
+    decrypt_row,
+    add_credentials,
+    add_credentials_batch,
+    update_credentials,
+    delete_credentials,
+    search_credentials,
+    filter_stats
+)
+from sessions import SessionStore
+from user_directory import UserDirectory
+from events import EVENT_HEARTBEAT_SECONDS, ThreadSubscription, broker, event_stats, format_event, publish
+from hashing_pool import HashingOverloaded, hashing_stats
+import metrics
+from log_queue import log_stats, setup_logging
+from importer import import_credentials, open_export
+from parallel_crypto import get_shared_executor
 
-# Load environment variables
-load_dotenv()
-
-app = Flask(__name__)
-
-# Update CORS configuration
-CORS(app, 
-     resources={r"/*": {
-         "origins": ["http://localhost:5000", "chrome-extension://*", "http://*", "https://*"],
-         "methods": ["GET", "POST", "OPTIONS"],
-         "allow_headers": ["Content-Type", "Authorization", "Accept"],
-         "supports_credentials": True,
-         "expose_headers": ["Content-Type", "Authorization"],
-         "max_age": 3600
-     }},
-     supports_credentials=True)
-
-# Configuration
-app.config['SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'your-secret-key')
-app.config['JWT_EXPIRATION_DELTA'] = timedelta(hours=1)
-app.config['SESSION_COOKIE_SAMESITE'] = 'None'  # Changed to None to allow cross-site cookies
-app.config['SESSION_COOKIE_SECURE'] = False  # Set to True in production with HTTPS
-
-# Ensure required directories and files exist
-Path("data").mkdir(exist_ok=True)
+log = logging.getLogger('pm.app')
+session_log = logging.getLogger('pm.session')
+
+bp = Blueprint('main', __name__)
+
+SESSION_COOKIE = 'pm_session'
 USER_DATA_FILE = "data/user_data.csv"
-SESSION_FILE = "data/session.txt"
-
-# Initialize encryption key
-def get_or_create_key():
-    key_file = "data/key.key"
-    if os.path.exists(key_file):
-        with open(key_file, "rb") as f:
-            return f.read()
-    else:
-        key = Fernet.generate_key()
-        with open(key_file, "wb") as f:
-            f.write(key)
-        return key
-
-ENCRYPTION_KEY = get_or_create_key()
-cipher_suite = Fernet(ENCRYPTION_KEY)
+users = UserDirectory(USER_DATA_FILE, 'email', ['email', 'password'])
+
+_storage_lock = threading.Lock()
+storage_initialized = False
+
+def create_app(config=None):
+    """
+    Build the Flask app. Only reads configuration; files, tables and the
+    compactor are set up by init_storage() on the first request.
+    """
+    # Load environment variables
+    load_dotenv()
+    setup_logging()
+    
+    app = Flask(__name__)
+    
+    # Update CORS configuration
+    CORS(app, 
+         resources={r"/*": {
+             "origins": ["http://localhost:5000", "chrome-extension://*", "http://*", "https://*"],
+             "methods": ["GET", "POST", "OPTIONS"],
+             "allow_headers": ["Content-Type", "Authorization", "Accept"],
+             "supports_credentials": True,
+             "expose_headers": ["Content-Type", "Authorization"],
+             "max_age": 3600
+         }},
+         supports_credentials=True)
+    
+    # Configuration
+    app.config['SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'your-secret-key')
+    app.config['JWT_EXPIRATION_DELTA'] = timedelta(hours=1)
+    app.config['SESSION_COOKIE_SAMESITE'] = 'None'  # Changed to None to allow cross-site cookies
+    app.config['SESSION_COOKIE_SECURE'] = False  # Forced on below while SameSite is None
+    app.config['SESSION_TTL'] = timedelta(hours=int(os.getenv('SESSION_TTL_HOURS', '8')))
+    app.config['MAX_BATCH_SIZE'] = int(os.getenv('MAX_BATCH_SIZE', '200'))
+    app.config['SEARCH_PAGE_SIZE'] = 20
+    app.config['MAX_SEARCH_PAGE_SIZE'] = 100
+    app.config['VAULT_PAGE_SIZE'] = 100
+    app.config['MAX_VAULT_PAGE_SIZE'] = 1000
+    if config:
+        app.config.update(config)
+    if app.config['SESSION_COOKIE_SAMESITE'] == 'None':
+        # Browsers drop SameSite=None cookies that are not Secure. Secure
+        # cookies still work on http://localhost, which counts as secure
+        app.config['SESSION_COOKIE_SECURE'] = True
+    
+    sessions = SessionStore(app.config['SECRET_KEY'], app.config['SESSION_TTL'].total_seconds())
+    app.extensions['sessions'] = sessions
+    
+    # Gauges read from the existing stats functions when /metrics is scraped
+    metrics.register_collector('pm_db_pool', 'SQLite connection pool.', pool_stats)
+    metrics.register_collector('pm_db_compactor', 'Background WAL checkpoint and vacuum.', compactor_stats)
+    metrics.register_collector('pm_cipher_cache', 'Per-user Fernet cipher cache.', cipher_cache_stats)
+    metrics.register_collector('pm_host_filter', 'Negative-lookup Bloom filters.', filter_stats)
+    metrics.register_collector('pm_hashing', 'Password hashing pool.', hashing_stats)
+    metrics.register_collector('pm_events', 'Server-sent event subscribers.', event_stats)
+    metrics.register_collector('pm_logging', 'Background log queue.', log_stats)
+    metrics.register_collector('pm_user_directory', 'Accounts loaded from user_data.csv.', users.stats)
+    metrics.register_collector('pm_sessions', 'Active sessions.', lambda: {'active': sessions.active_count()})
+    
+    app.register_blueprint(bp)
+    return app
+
+def init_storage():
+    """
+    Create the data files and database tables and start the compactor.
+    Runs once per process; later calls only check a flag.
+    """
+    global storage_initialized
+    if storage_initialized:
+        return
+    with _storage_lock:
+        if storage_initialized:
+            return
+        # Ensure required directories and files exist
+        Path("data").mkdir(exist_ok=True)
+        init_files()
+        init_db()
+        init_vault()
+        start_compactor()
+        storage_initialized = True
+
+def get_sessions():
+    return current_app.extensions['sessions']
+
+@bp.before_app_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    init_storage()
+
+@bp.app_errorhandler(HashingOverloaded)
+def hashing_overloaded(e):
+    # Key derivation and password hashing are queued; shed load instead of waiting
+    return jsonify({'message': str(e)}), 503, {'Retry-After': '1'}
+
+@bp.after_app_request
+def record_request_metrics(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        # Label by route pattern, not raw path, to keep the series bounded
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.request_seconds.observe(time.perf_counter() - started, route, request.method)
+        metrics.requests_total.inc(route, request.method, str(response.status_code))
+    return response
 
 def init_files():
     if not os.path.exists(USER_DATA_FILE):
@@ -58,63 +155,67 @@ def init_files():
             writer = csv.writer(f)
             writer.writerow(['email', 'password'])
 
-def get_current_user():
-    try:
-        if os.path.exists(SESSION_FILE):
-            with open(SESSION_FILE, 'r') as f:
-                email = f.read().strip()
-                print(f"Current user from session: {email}")
-                return email
-        print("No session file found")
-        return None
-    except Exception as e:
-        print(f"Error getting current user: {str(e)}")
-        return None
+def get_session_token():
+    # Browser clients send the session cookie; API clients may use a bearer token
+    auth_header = request.headers.get('Authorization', '')
+    if auth_header.startswith('Bearer '):
+        return auth_header[len('Bearer '):]
+    return request.cookies.get(SESSION_COOKIE)
 
-def save_session(email):
-    try:
-        with open(SESSION_FILE, 'w') as f:
-            f.write(email)
-        print(f"Session saved for user: {email}")
-    except Exception as e:
-        print(f"Error saving session: {str(e)}")
+def get_current_user():
+    with metrics.stage_seconds.time('session'):
+        return get_sessions().resolve(get_session_token())
 
-def clear_session():
-    if os.path.exists(SESSION_FILE):
-        os.remove(SESSION_FILE)
+def save_session(response, email):
+    # Derive the vault key now rather than on the first autofill
+    warm_cipher(get_user_id(email))
+    token = get_sessions().create(email)
+    response.set_cookie(
+        SESSION_COOKIE,
+        token,
+        max_age=int(current_app.config['SESSION_TTL'].total_seconds()),
+        httponly=True,
+        secure=current_app.config['SESSION_COOKIE_SECURE'],
+        samesite=current_app.config['SESSION_COOKIE_SAMESITE']
+    )
+    session_log.info('Session saved', extra={'user': email})
+    publish(email, 'login')
+    return response
 
-def get_user_credentials_file(email):
-    return f"data/credentials_{email}.csv"
+def clear_session(response):
+    email = get_sessions().revoke(get_session_token())
+    if email:
+        evict_cipher(get_user_id(email))
+        publish(email, 'logout')
+    response.delete_cookie(
+        SESSION_COOKIE,
+        secure=current_app.config['SESSION_COOKIE_SECURE'],
+        samesite=current_app.config['SESSION_COOKIE_SAMESITE']
+    )
+    return response
 
-def init_user_credentials(email):
-    cred_file = get_user_credentials_file(email)
-    if not os.path.exists(cred_file):
-        with open(cred_file, 'w', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow(['website_url', 'username_or_email', 'encrypted_password'])
+def is_text(*values):
+    # JSON bodies can carry any type; only non-empty strings are usable
+    return all(isinstance(value, str) and value for value in values)
 
 def check_user_exists(email):
-    if not os.path.exists(USER_DATA_FILE):
-        return False
-    with open(USER_DATA_FILE, 'r', newline='') as f:
-        reader = csv.DictReader(f)
-        return any(row['email'] == email for row in reader)
+    return email in users
 
 def verify_credentials(email, password):
-    if not os.path.exists(USER_DATA_FILE):
-        return False
-    with open(USER_DATA_FILE, 'r', newline='') as f:
-        reader = csv.DictReader(f)
-        return any(row['email'] == email and row['password'] == password for row in reader)
+    # Returns the email as registered, so the session and vault don't depend on how it was typed
+    user = users.get(email)
+    if user is None or user['password'] != password:
+        return None
+    return user['email']
 
-@app.route('/')
+@bp.route('/')
 def index():
     current_user = get_current_user()
     if current_user:
         return render_template('dashboard.html', email=current_user)
     return render_template('login.html')
 
-@app.route('/register', methods=['GET', 'POST'])
+@bp.route('/register', methods=['GET', 'POST'])
 def register():
     if request.method == 'POST':
         data = request.form
@@ -124,23 +225,18 @@ def register():
         if not email or not password:
             return jsonify({'message': 'Email and password are required'}), 400
         
-        # Check if user already exists
-        if check_user_exists(email):
+        # Save new user unless one already exists; checked and written under one lock
+        if not users.add(email, {'email': email, 'password': password}):
             return jsonify({'message': 'User already exists'}), 400
         
-        # Save new user
-        with open(USER_DATA_FILE, 'a', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow([email, password])
-        
-        # Initialize credentials file for new user
-        init_user_credentials(email)
+        # Create the vault user for the new account
+        get_user_id(email)
         
-        return redirect(url_for('login'))
+        return redirect(url_for('.login'))
     
     return render_template('register.html')
 
-@app.route('/login', methods=['GET', 'POST'])
+@bp.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         data = request.form
@@ -151,30 +247,28 @@ def login():
             return jsonify({'message': 'Email and password are required'}), 400
         
         # Verify credentials
-        if verify_credentials(email, password):
-            save_session(email)
-            return redirect(url_for('index'))
+        account = verify_credentials(email, password)
+        if account:
+            return save_session(redirect(url_for('.index')), account)
         
         return jsonify({'message': 'Invalid credentials'}), 401
     
     return render_template('login.html')
 
-@app.route('/logout')
+@bp.route('/logout')
 def logout():
-    clear_session()
-    return redirect(url_for('login'))
+    return clear_session(redirect(url_for('.login')))
 
-@app.route('/save_credentials', methods=['POST', 'OPTIONS'])
+@bp.route('/save_credentials', methods=['POST', 'OPTIONS'])
 def save_credentials():
     if request.method == 'OPTIONS':
         return '', 200
         
     try:
         current_user = get_current_user()
-        print(f"Attempting to save credentials. Current user: {current_user}")
         
         if not current_user:
-            print("No user logged in")
+            log.info('Save rejected: not logged in')
             return jsonify({'message': 'Not logged in'}), 401
         
         data = request.get_json()
@@ -182,47 +276,30 @@ def save_credentials():
         username = data.get('username')
         password = data.get('password')
         
-        print(f"Received credentials for {website_url} from user {current_user}")
+        log.debug('Received credentials', extra={'user': current_user, 'website': website_url})
         
-        if not all([website_url, username, password]):
-            print("Missing required fields")
+        if not is_text(website_url, username, password):
+            log.info('Save rejected: missing required fields', extra={'user': current_user})
             return jsonify({'message': 'Missing required fields'}), 400
         
-        # Encrypt password
-        encrypted_password = cipher_suite.encrypt(password.encode()).decode()
-        
-        # Save credentials
-        cred_file = get_user_credentials_file(current_user)
-        print(f"Saving to file: {cred_file}")
-        
-        # Initialize file if it doesn't exist
-        init_user_credentials(current_user)
-        
-        # Check if credentials already exist
-        credentials_exist = False
-        if os.path.exists(cred_file):
-            with open(cred_file, 'r', newline='') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if row['website_url'] == website_url and row['username_or_email'] == username:
-                        credentials_exist = True
-                        break
+        # Encrypt and save credentials (duplicate check uses the in-memory hostname index)
+        credentials_saved = add_credentials(current_user, website_url, username, password)
         
-        if not credentials_exist:
-            with open(cred_file, 'a', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow([website_url, username, encrypted_password])
-            print("Credentials saved successfully")
+        if credentials_saved:
+            log.info('Credentials saved', extra={'user': current_user, 'website': website_url})
             return jsonify({'message': 'Credentials saved successfully'}), 201
         else:
-            print("Credentials already exist")
+            log.info('Credentials already exist', extra={'user': current_user, 'website': website_url})
             return jsonify({'message': 'Credentials already exist'}), 200
             
+    except HashingOverloaded:
+        # Answered with 503 and Retry-After by hashing_overloaded()
+        raise
     except Exception as e:
-        print(f"Error saving credentials: {str(e)}")
+        log.exception('Error saving credentials')
         return jsonify({'message': f'Error saving credentials: {str(e)}'}), 500
 
-@app.route('/get_credentials', methods=['POST'])
+@bp.route('/get_credentials', methods=['POST'])
 def get_credentials():
     current_user = get_current_user()
     if not current_user:
@@ -231,48 +308,342 @@ def get_credentials():
     data = request.get_json()
     website_url = data.get('websiteUrl')
     
-    if not website_url:
+    if not is_text(website_url):
         return jsonify({'message': 'Website URL is required'}), 400
     
-    # Get credentials for website
-    cred_file = get_user_credentials_file(current_user)
-    if not os.path.exists(cred_file):
-        return jsonify({'message': 'No credentials found'}), 404
-    
+    # Get credentials for website from the in-memory hostname index
     credentials = []
-    with open(cred_file, 'r', newline='') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            if row['website_url'] == website_url:
-                decrypted_password = cipher_suite.decrypt(row['encrypted_password'].encode()).decode()
-                credentials.append({
-                    'username': row['username_or_email'],
-                    'password': decrypted_password
-                })
+    for row in find_credentials(current_user, website_url):
+        credentials.append({
+            'websiteUrl': row['website_url'],
+            'username': row['username'],
+            'password': decrypt_row(row)
+        })
     
     if not credentials:
+        metrics.credential_lookups_total.inc('get_credentials', 'miss')
         return jsonify({'message': 'No credentials found for this website'}), 404
     
+    metrics.credential_lookups_total.inc('get_credentials', 'hit')
     return jsonify({'credentials': credentials}), 200
 
-@app.route('/get_current_user', methods=['GET', 'OPTIONS'])
+# Batch endpoints: resolve the session and the vault index once per request
+@bp.route('/get_credentials_batch', methods=['POST', 'OPTIONS'])
+def get_credentials_batch():
+    if request.method == 'OPTIONS':
+        return '', 200
+    
+    current_user = get_current_user()
+    if not current_user:
+        return jsonify({'message': 'Not logged in'}), 401
+    
+    data = request.get_json()
+    website_urls = data.get('websiteUrls')
+    
+    if not isinstance(website_urls, list) or not website_urls or not is_text(*website_urls):
+        return jsonify({'message': 'websiteUrls must be a non-empty list of strings'}), 400
+    if len(website_urls) > current_app.config['MAX_BATCH_SIZE']:
+        return jsonify({'message': f"At most {current_app.config['MAX_BATCH_SIZE']} websites per batch"}), 400
+    
+    results = {}
+    for website_url, rows in find_credentials_batch(current_user, website_urls).items():
+        metrics.credential_lookups_total.inc('get_credentials_batch', 'hit' if rows else 'miss')
+        results[website_url] = [{
+            'websiteUrl': row['website_url'],
+            'username': row['username'],
+            'password': decrypt_row(row),
+            'match': kind
+        } for row, kind in rows]
+    
+    return jsonify({'results': results}), 200
+
+@bp.route('/save_credentials_batch', methods=['POST', 'OPTIONS'])
+def save_credentials_batch():
+    if request.method == 'OPTIONS':
+        return '', 200
+    
+    current_user = get_current_user()
+    if not current_user:
+        return jsonify({'message': 'Not logged in'}), 401
+    
+    data = request.get_json()
+    items = data.get('credentials')
+    
+    if not isinstance(items, list) or not items:
+        return jsonify({'message': 'credentials must be a non-empty list'}), 400
+    if len(items) > current_app.config['MAX_BATCH_SIZE']:
+        return jsonify({'message': f"At most {current_app.config['MAX_BATCH_SIZE']} credentials per batch"}), 400
+    
+    results = [None] * len(items)
+    entries = []
+    positions = []
+    for i, item in enumerate(items):
+        fields = [item.get(k) for k in ('websiteUrl', 'username', 'password')] if isinstance(item, dict) else []
+        if len(fields) != 3 or not is_text(*fields):
+            results[i] = 'invalid'
+            continue
+        entries.append(tuple(fields))
+        positions.append(i)
+    
+    if entries:
+        for i, written in zip(positions, add_credentials_batch(current_user, entries)):
+            results[i] = 'saved' if written else 'exists'
+    
+    return jsonify({
+        'results': results,
+        'saved': results.count('saved'),
+        'existing': results.count('exists'),
+        'invalid': results.count('invalid')
+    }), 200
+
+# Bulk import of a password export file (Chrome, Firefox, Bitwarden, ...)
+@bp.route('/import_credentials', methods=['POST'])
+def import_credentials_file():
+    current_user = get_current_user()
+    if not current_user:
+        return jsonify({'message': 'Not logged in'}), 401
+    
+    upload = request.files.get('file')
+    if upload is None:
+        return jsonify({'message': 'A CSV file is required'}), 400
+    
+    try:
+        # The server's long-lived pool; a per-request process pool would
+        # fork this multi-threaded process on every upload
+        stats = import_credentials(
+            current_user,
+            open_export(upload.stream),
+            executor=get_shared_executor()
+        )
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        return jsonify({'message': f'Could not import file: {str(e)}'}), 400
+    
+    return jsonify({'message': 'Import finished', **stats}), 200
+
+# Two-phase lookup: list accounts without decrypting, then reveal one entry
+@bp.route('/list_credentials', methods=['POST'])
+def list_credentials():
+    current_user = get_current_user()
+    if not current_user:
+        return jsonify({'message': 'Not logged in'}), 401
+    
+    data = request.get_json()
+    website_url = data.get('websiteUrl')
+    
+    if not is_text(website_url):
+        return jsonify({'message': 'Website URL is required'}), 400
+    
+    version, rows = find_credentials_versioned(current_user, website_url)
+    credentials = [{
+        'id': credential_id(row),
+        'websiteUrl': row['website_url'],
+        'username': row['username']
+    } for row in rows]
+    
+    if not credentials:
+        return jsonify({'message': 'No credentials found for this website', 'version': version}), 404
+    
+    return jsonify({'credentials': credentials, 'version': version}), 200
+
+@bp.route('/reveal_credential', methods=['POST'])
+def reveal_credential():
+    current_user = get_current_user()
+    if not current_user:
+        return jsonify({'message': 'Not logged in'}), 401
+    
+    data = request.get_json()
+    website_url = data.get('websiteUrl')
+    entry_id = data.get('id')
+    
+    if not is_text(website_url) or not entry_id:
+        return jsonify({'message': 'Website URL and id are required'}), 400
+    
+    row = find_credential(current_user, website_url, entry_id)
+    if row is None:
+        return jsonify({'message': 'Credential not found'}), 404
+    
+    return jsonify({
+        'id': entry_id,
+        'username': row['username'],
+        'password': decrypt_row(row)
+    }), 200
+
+# Server-sent events: login/logout and vault changes for the current user
+@bp.route('/events', methods=['GET'])
+def events():
+    token = get_session_token()
+    sessions = get_sessions()
+    current_user = sessions.resolve(token)
+    if not current_user:
+        return jsonify({'message': 'Not logged in'}), 401
+    
+    def generate():
+        # Subscribed inside the generator, so finally always runs for it
+        subscription = ThreadSubscription(token)
+        broker.subscribe(current_user, subscription)
+        try:
+            yield 'retry: 5000\n\n' + format_event('ready', {'email': current_user})
+            while True:
+                event = subscription.get(EVENT_HEARTBEAT_SECONDS)
+                if subscription.overflowed:
+                    subscription.overflowed = False
+                    yield format_event('resync')
+                if event is None or event[0] == 'logout':
+                    # Checked without extending the session, so an open
+                    # stream doesn't keep it alive past its TTL. Another
+                    # session of this user ending doesn't end this one
+                    if sessions.peek(token) is None:
+                        yield format_event('logout', event[1] if event else {})
+                        return
+                    if event is None:
+                        yield ': keepalive\n\n'
+                    continue
+                name, data = event
+                yield format_event(name, data)
+        finally:
+            broker.unsubscribe(current_user, subscription)
+    
+    # No request context is kept for the life of the stream
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+# Whole-vault listing, paged by id (?after=<cursor>&limit=<n>) or streamed (?stream=1)
+@bp.route('/vault_credentials', methods=['GET'])
+def vault_credentials():
+    current_user = get_current_user()
+    if not current_user:
+        return jsonify({'message': 'Not logged in'}), 401
+    
+    try:
+        after_id = int(request.args.get('after', 0))
+        limit = int(request.args.get('limit', current_app.config['VAULT_PAGE_SIZE']))
+    except ValueError:
+        return jsonify({'message': 'after and limit must be integers'}), 400
+    
+    user_id = get_user_id(current_user)
+    
+    if request.args.get('stream') in ('1', 'true'):
+        def generate():
+            yield '{"credentials": ['
+            for i, cred in enumerate(iter_credentials(user_id, after_id)):
+                yield (',' if i else '') + json.dumps(cred)
+            yield ']}'
+        
+        return Response(stream_with_context(generate()), mimetype='application/json')
+    
+    if not 0 < limit <= current_app.config['MAX_VAULT_PAGE_SIZE']:
+        return jsonify({'message': f"limit must be between 1 and {current_app.config['MAX_VAULT_PAGE_SIZE']}"}), 400
+    
+    credentials, next_cursor = get_credentials_page(user_id, after_id, limit)
+    return jsonify({'credentials': credentials, 'next_cursor': next_cursor}), 200
+
+# Delta sync: changes since a vault version, or a snapshot if the log no longer covers it
+@bp.route('/sync', methods=['GET'])
+def sync():
+    current_user = get_current_user()
+    if not current_user:
+        return jsonify({'message': 'Not logged in'}), 401
+    
+    try:
+        since = int(request.args.get('since', 0))
+    except ValueError:
+        return jsonify({'message': 'since must be an integer'}), 400
+    
+    return jsonify(get_changes_since(get_user_id(current_user), since)), 200
+
+# Type-ahead search over websites and usernames; passwords stay encrypted
+@bp.route('/search_credentials', methods=['POST'])
+def search_credentials_route():
+    current_user = get_current_user()
+    if not current_user:
+        return jsonify({'message': 'Not logged in'}), 401
+    
+    data = request.get_json() or {}
+    query = data.get('query', '')
+    try:
+        offset = int(data.get('offset', 0))
+        limit = int(data.get('limit', current_app.config['SEARCH_PAGE_SIZE']))
+    except (TypeError, ValueError):
+        return jsonify({'message': 'offset and limit must be integers'}), 400
+    
+    if not isinstance(query, str):
+        return jsonify({'message': 'query must be a string'}), 400
+    if offset < 0:
+        return jsonify({'message': 'offset must not be negative'}), 400
+    if not 0 < limit <= current_app.config['MAX_SEARCH_PAGE_SIZE']:
+        return jsonify({'message': f"limit must be between 1 and {current_app.config['MAX_SEARCH_PAGE_SIZE']}"}), 400
+    
+    total, rows = search_credentials(current_user, query, offset, limit)
+    return jsonify({
+        'total': total,
+        'offset': offset,
+        'limit': limit,
+        'results': [{
+            'id': credential_id(row),
+            'websiteUrl': row['website_url'],
+            'username': row['username']
+        } for row in rows]
+    }), 200
+
+@bp.route('/update_credential', methods=['POST'])
+def update_credential():
+    current_user = get_current_user()
+    if not current_user:
+        return jsonify({'message': 'Not logged in'}), 401
+    
+    data = request.get_json()
+    website_url = data.get('websiteUrl')
+    entry_id = data.get('id')
+    password = data.get('password')
+    
+    if not is_text(website_url, password) or not entry_id:
+        return jsonify({'message': 'Missing required fields'}), 400
+    
+    if not update_credentials(current_user, website_url, entry_id, password):
+        return jsonify({'message': 'Credential not found'}), 404
+    
+    return jsonify({'message': 'Credential updated successfully'}), 200
+
+@bp.route('/delete_credential', methods=['POST'])
+def delete_credential():
+    current_user = get_current_user()
+    if not current_user:
+        return jsonify({'message': 'Not logged in'}), 401
+    
+    data = request.get_json()
+    website_url = data.get('websiteUrl')
+    entry_id = data.get('id')
+    
+    if not is_text(website_url) or not entry_id:
+        return jsonify({'message': 'Website URL and id are required'}), 400
+    
+    if not delete_credentials(current_user, website_url, entry_id):
+        return jsonify({'message': 'Credential not found'}), 404
+    
+    return jsonify({'message': 'Credential deleted successfully'}), 200
+
+# Prometheus text format; everything is summarised at scrape time
+@bp.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@bp.route('/get_current_user', methods=['GET', 'OPTIONS'])
 def get_current_user_status():
     if request.method == 'OPTIONS':
         return '', 200
         
     try:
         current_user = get_current_user()
-        print(f"Checking current user status: {current_user}")
+        session_log.debug('Checked current user status', extra={'user': current_user})
         return jsonify({
             'logged_in': current_user is not None,
             'email': current_user if current_user else None
         })
-    except Exception as e:
-        print(f"Error getting current user status: {str(e)}")
+    except Exception:
+        session_log.exception('Error getting current user status')
         return jsonify({'logged_in': False, 'email': None})
 
-# Initialize required files
-init_files()
-
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True) 
\ No newline at end of file
+    create_app().run(host='0.0.0.0', port=5000, debug=True) 
\ No newline at end of file
@@ -0,0 +1,336 @@
+"""
+Asyncio (ASGI) serving mode for the extension's hot routes.
+
+Serves /get_credentials, /save_credentials, /get_current_user, /login and
+the /events stream with the same request and response shapes as app.py
+(a successful /login is a 302 to / that sets the session cookie, with no
+body), sharing its session table, user store, credential index and event
+broker. The login form page (GET /login) is only served by app.py.
+Connections are handled on the
+event loop; blocking storage calls and Fernet work run on small bounded
+thread pools, so hundreds of idle or slow extension connections (including
+open event streams) do not each hold a thread.
+
+    pip install -r requirements.txt
+    uvicorn asgi_app:app --port 5000
+"""
+import asyncio
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+import app as flask_backend
+from app import session_log
+from credential_store import add_credentials, decrypt_row, find_credentials, find_credentials_cached, get_user_id
+from hashing_pool import HashingOverloaded
+from vault import warm_cipher
+from events import EVENT_HEARTBEAT_SECONDS, AsyncSubscription, broker, format_event, publish
+
+STORAGE_WORKERS = int(os.getenv('ASGI_STORAGE_WORKERS', '8'))
+CRYPTO_WORKERS = int(os.getenv('ASGI_CRYPTO_WORKERS', str(os.cpu_count() or 1)))
+MAX_BODY_BYTES = 1024 * 1024
+
+log = logging.getLogger('pm.asgi')
+
+storage_executor = ThreadPoolExecutor(max_workers=STORAGE_WORKERS, thread_name_prefix='storage')
+crypto_executor = ThreadPoolExecutor(max_workers=CRYPTO_WORKERS, thread_name_prefix='crypto')
+
+flask_app = flask_backend.create_app()
+config = flask_app.config
+sessions = flask_app.extensions['sessions']
+
+
+class Request:
+    def __init__(self, scope: dict, body: bytes):
+        self.method = scope['method']
+        self.path = scope['path']
+        self.headers = {k.decode('latin-1').lower(): v.decode('latin-1') for k, v in scope['headers']}
+        self.body = body
+
+    def json(self) -> dict:
+        try:
+            data = json.loads(self.body or b'{}')
+        except ValueError:
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def form(self) -> Dict[str, str]:
+        return {k: v[0] for k, v in parse_qs(self.body.decode()).items()}
+
+    def data(self) -> dict:
+        if self.headers.get('content-type', '').startswith('application/json'):
+            return self.json()
+        return self.form()
+
+    def session_token(self) -> Optional[str]:
+        auth_header = self.headers.get('authorization', '')
+        if auth_header.startswith('Bearer '):
+            return auth_header[len('Bearer '):]
+        cookie = SimpleCookie(self.headers.get('cookie', ''))
+        morsel = cookie.get(flask_backend.SESSION_COOKIE)
+        return morsel.value if morsel else None
+
+    def current_user(self) -> Optional[str]:
+        return sessions.resolve(self.session_token())
+
+
+Response = Tuple[int, dict, List[Tuple[str, str]]]
+
+
+async def run_storage(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(storage_executor, fn, *args)
+
+
+async def run_crypto(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(crypto_executor, fn, *args)
+
+
+def decrypt_rows(rows: List[dict]) -> List[dict]:
+    return [{
+        'websiteUrl': row['website_url'],
+        'username': row['username'],
+        'password': decrypt_row(row)
+    } for row in rows]
+
+
+async def get_current_user_status(request: Request) -> Response:
+    current_user = request.current_user()
+    return 200, {'logged_in': current_user is not None, 'email': current_user}, []
+
+
+async def login(request: Request) -> Response:
+    data = request.data()
+    email = data.get('email')
+    password = data.get('password')
+
+    if not email or not password:
+        return 400, {'message': 'Email and password are required'}, []
+
+    account = await run_storage(flask_backend.verify_credentials, email, password)
+    if not account:
+        return 401, {'message': 'Invalid credentials'}, []
+    email = account
+
+    # Derive the vault key now rather than on the first autofill
+    await run_storage(lambda: warm_cipher(get_user_id(email)))
+    token = sessions.create(email)
+    publish(email, 'login')
+    cookie = SimpleCookie()
+    cookie[flask_backend.SESSION_COOKIE] = token
+    morsel = cookie[flask_backend.SESSION_COOKIE]
+    morsel['path'] = '/'
+    morsel['httponly'] = True
+    morsel['max-age'] = int(config['SESSION_TTL'].total_seconds())
+    morsel['samesite'] = config['SESSION_COOKIE_SAMESITE']
+    if config['SESSION_COOKIE_SECURE']:
+        morsel['secure'] = True
+    session_log.info('Session saved', extra={'user': email})
+    # Same answer as app.py: the token only travels in the httponly cookie
+    return 302, None, [('location', '/'), ('set-cookie', morsel.OutputString())]
+
+
+async def get_credentials(request: Request) -> Response:
+    current_user = request.current_user()
+    if not current_user:
+        return 401, {'message': 'Not logged in'}, []
+
+    website_url = request.json().get('websiteUrl')
+    if not flask_backend.is_text(website_url):
+        return 400, {'message': 'Website URL is required'}, []
+
+    # Fresh indexes are answered inline; only revalidation goes to a thread
+    rows = find_credentials_cached(current_user, website_url)
+    if rows is None:
+        rows = await run_storage(find_credentials, current_user, website_url)
+    if not rows:
+        return 404, {'message': 'No credentials found for this website'}, []
+
+    return 200, {'credentials': await run_crypto(decrypt_rows, rows)}, []
+
+
+async def save_credentials(request: Request) -> Response:
+    current_user = request.current_user()
+    if not current_user:
+        return 401, {'message': 'Not logged in'}, []
+
+    data = request.json()
+    website_url = data.get('websiteUrl')
+    username = data.get('username')
+    password = data.get('password')
+
+    if not flask_backend.is_text(website_url, username, password):
+        return 400, {'message': 'Missing required fields'}, []
+
+    try:
+        saved = await run_storage(add_credentials, current_user, website_url, username, password)
+    except HashingOverloaded:
+        raise
+    except Exception as e:
+        log.exception('Error saving credentials')
+        return 500, {'message': f'Error saving credentials: {str(e)}'}, []
+
+    if saved:
+        return 201, {'message': 'Credentials saved successfully'}, []
+    return 200, {'message': 'Credentials already exist'}, []
+
+
+ROUTES = {
+    '/get_current_user': (('GET',), get_current_user_status),
+    '/login': (('POST',), login),
+    '/get_credentials': (('POST',), get_credentials),
+    '/save_credentials': (('POST',), save_credentials),
+}
+
+
+async def stream_events(request: Request, receive, send, cors: List[Tuple[str, str]]) -> None:
+    token = request.session_token()
+    current_user = sessions.resolve(token)
+    if not current_user:
+        await send_json(send, 401, {'message': 'Not logged in'}, cors)
+        return
+
+    subscription = AsyncSubscription(asyncio.get_running_loop(), token)
+    broker.subscribe(current_user, subscription)
+    # The body has been read, so the next message is the client going away
+    disconnected = asyncio.ensure_future(receive())
+
+    async def write(text: str) -> None:
+        await send({'type': 'http.response.body', 'body': text.encode(), 'more_body': True})
+
+    try:
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+        ] + [(k.encode('latin-1'), v.encode('latin-1')) for k, v in cors]})
+        await write('retry: 5000\n\n' + format_event('ready', {'email': current_user}))
+
+        while True:
+            next_event = asyncio.ensure_future(subscription.get(EVENT_HEARTBEAT_SECONDS))
+            await asyncio.wait({next_event, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if disconnected.done():
+                next_event.cancel()
+                return
+            event = next_event.result()
+            if subscription.overflowed:
+                subscription.overflowed = False
+                await write(format_event('resync'))
+            if event is None or event[0] == 'logout':
+                # Checked without extending the session, so an open stream
+                # doesn't keep it alive past its TTL. Another session of
+                # this user ending doesn't end this one
+                if sessions.peek(token) is None:
+                    await write(format_event('logout', event[1] if event else {}))
+                    await send({'type': 'http.response.body', 'body': b''})
+                    return
+                if event is None:
+                    await write(': keepalive\n\n')
+                continue
+            name, data = event
+            await write(format_event(name, data))
+    finally:
+        broker.unsubscribe(current_user, subscription)
+        disconnected.cancel()
+
+
+# Long-lived responses that write to the connection themselves
+STREAM_ROUTES = {
+    '/events': stream_events,
+}
+
+
+def cors_headers(request_headers: Dict[str, str]) -> List[Tuple[str, str]]:
+    # Mirrors the flask-cors setup in app.py: reflect the origin and allow credentials
+    origin = request_headers.get('origin')
+    if not origin:
+        return []
+    return [
+        ('access-control-allow-origin', origin),
+        ('access-control-allow-credentials', 'true'),
+        ('access-control-expose-headers', 'Content-Type, Authorization'),
+        ('vary', 'Origin'),
+    ]
+
+
+async def read_body(receive) -> Optional[bytes]:
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            raise ValueError('Request body too large')
+        chunks.append(chunk)
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+async def send_json(send, status: int, payload, headers: List[Tuple[str, str]]) -> None:
+    body = b'' if payload is None else json.dumps(payload).encode()
+    raw_headers = [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+    raw_headers += [(k.encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+    await send({'type': 'http.response.start', 'status': status, 'headers': raw_headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await run_storage(flask_backend.init_storage)
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                storage_executor.shutdown(wait=False)
+                crypto_executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    if scope['type'] != 'http':
+        return
+    if not flask_backend.storage_initialized:
+        # Servers run without lifespan events still initialise on first use
+        await run_storage(flask_backend.init_storage)
+
+    try:
+        body = await read_body(receive)
+    except ValueError as e:
+        await send_json(send, 413, {'message': str(e)}, [])
+        return
+    if body is None:
+        return
+    request = Request(scope, body)
+    cors = cors_headers(request.headers)
+
+    if request.path in STREAM_ROUTES and request.method == 'GET':
+        await STREAM_ROUTES[request.path](request, receive, send, cors)
+        return
+
+    route = ROUTES.get(request.path)
+    if route is None:
+        await send_json(send, 404, {'message': 'Not found'}, cors)
+        return
+
+    methods, handler = route
+    if request.method == 'OPTIONS':
+        await send_json(send, 200, None, cors + [
+            ('access-control-allow-methods', 'GET, POST, OPTIONS'),
+            ('access-control-allow-headers', 'Content-Type, Authorization, Accept'),
+            ('access-control-max-age', '3600'),
+        ])
+        return
+    if request.method not in methods:
+        await send_json(send, 405, {'message': 'Method not allowed'}, cors)
+        return
+
+    try:
+        status, payload, headers = await handler(request)
+    except HashingOverloaded as e:
+        status, payload, headers = 503, {'message': str(e)}, [('retry-after', '1')]
+    await send_json(send, status, payload, cors + headers)
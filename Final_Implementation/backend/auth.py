@@ -1,44 +1,129 @@
-import sqlite3
+from db_pool import get_connection
+from hashing_pool import run_hash
+from metrics import stage
+from user_directory import UserDirectory
 import bcrypt
-from typing import Optional
+from typing import Optional, Tuple
 import csv
 import os
+import threading
+import time
 from datetime import datetime
 
+# Target bcrypt verification time on this machine; BCRYPT_ROUNDS skips calibration
+HASH_TARGET_MS = float(os.getenv('HASH_TARGET_MS', '250'))
+# Stored hashes whose estimated cost falls outside target * [low, high] are rehashed on login
+HASH_TARGET_BAND = (
+    float(os.getenv('HASH_TARGET_BAND_LOW', '0.5')),
+    float(os.getenv('HASH_TARGET_BAND_HIGH', '2.0'))
+)
+BCRYPT_MIN_ROUNDS = 10
+BCRYPT_MAX_ROUNDS = 16
+
+USERS_FILE = 'users.csv'
+USERS_FIELDS = ['Username', 'Password Hash', 'Name', 'Age', 'Phone', 'Website URL', 'Registration Date']
+# Main accounts only; rows with a Website URL are saved site logins
+users = UserDirectory(USERS_FILE, 'Username', USERS_FIELDS, include=lambda row: not row.get('Website URL'))
+
+_calibration: Optional[Tuple[int, float]] = None
+_calibration_lock = threading.Lock()
+
 def get_db_connection():
-    conn = sqlite3.connect('password_manager.db')
-    conn.row_factory = sqlite3.Row
-    return conn
+    # Pooled connection; close() hands it back to the pool
+    return get_connection()
+
+def calibrate_bcrypt_rounds(target_ms: float = HASH_TARGET_MS) -> Tuple[int, float]:
+    """
+    Find the bcrypt cost whose hashing time on this machine is closest to
+    target_ms. Returns (rounds, measured_ms).
+    """
+    sample = b'calibration-password'
+    best = None
+    for rounds in range(BCRYPT_MIN_ROUNDS, BCRYPT_MAX_ROUNDS + 1):
+        salt = bcrypt.gensalt(rounds=rounds)
+        started = time.perf_counter()
+        bcrypt.hashpw(sample, salt)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if best is None or abs(elapsed_ms - target_ms) < abs(best[1] - target_ms):
+            best = (rounds, elapsed_ms)
+        # Each extra round doubles the time, so stop once past the target
+        if elapsed_ms >= target_ms:
+            break
+    return best
+
+def get_bcrypt_calibration() -> Tuple[int, float]:
+    """
+    Get (rounds, measured_ms) for new hashes, calibrating once per process.
+    """
+    global _calibration
+    if _calibration is None:
+        with _calibration_lock:
+            if _calibration is None:
+                rounds = os.getenv('BCRYPT_ROUNDS')
+                if rounds:
+                    _calibration = (int(rounds), HASH_TARGET_MS)
+                else:
+                    _calibration = run_hash(calibrate_bcrypt_rounds, HASH_TARGET_MS)
+    return _calibration
+
+def needs_rehash(password_hash: bytes) -> bool:
+    """
+    Check whether a stored bcrypt hash is outside the target time band.
+    The cost is read from the hash itself ($2b$<rounds>$...). A hash at the
+    calibrated cost is always in band, even when calibration was clamped to
+    BCRYPT_MIN_ROUNDS/BCRYPT_MAX_ROUNDS and misses the target itself, and
+    one below the minimum cost is always out of band.
+    """
+    try:
+        stored_rounds = int(password_hash.split(b'$')[2])
+    except (IndexError, ValueError):
+        return True
+    rounds, measured_ms = get_bcrypt_calibration()
+    if stored_rounds == rounds:
+        return False
+    if stored_rounds < min(rounds, BCRYPT_MIN_ROUNDS):
+        return True
+    estimated_ms = measured_ms * 2 ** (stored_rounds - rounds)
+    low, high = HASH_TARGET_BAND
+    return not (HASH_TARGET_MS * low <= estimated_ms <= HASH_TARGET_MS * high)
+
+@stage('bcrypt')
+def hash_password(password: str) -> bytes:
+    """
+    Hash a password with bcrypt on the dedicated hashing pool, using the
+    calibrated cost.
+    """
+    rounds, _ = get_bcrypt_calibration()
+    return run_hash(bcrypt.hashpw, password.encode('utf-8'), bcrypt.gensalt(rounds=rounds))
+
+@stage('bcrypt')
+def check_password(password: str, password_hash: bytes) -> bool:
+    """
+    Check a password against a bcrypt hash on the dedicated hashing pool.
+    """
+    return run_hash(bcrypt.checkpw, password.encode('utf-8'), password_hash)
+
+def _user_row(username: str, password_hash: bytes, name: str = None, age: int = None, phone: str = None,
+              website_url: str = None) -> dict:
+    return {
+        'Username': username,
+        'Password Hash': password_hash.decode('utf-8'),
+        'Name': name,
+        'Age': age,
+        'Phone': phone,
+        'Website URL': website_url,
+        'Registration Date': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    }
 
 def save_to_csv(username: str, password: str, name: str = None, age: int = None, phone: str = None, website_url: str = None) -> None:
     """
     Save user registration data or website credentials to a CSV file with encrypted password.
     """
     # Hash the password
-    salt = bcrypt.gensalt()
-    password_hash = bcrypt.hashpw(password.encode('utf-8'), salt)
+    password_hash = hash_password(password)
     
-    # Create users.csv if it doesn't exist
-    csv_file = 'users.csv'
-    file_exists = os.path.isfile(csv_file)
-    
-    with open(csv_file, mode='a', newline='') as file:
-        writer = csv.writer(file)
-        
-        # Write header if file is new
-        if not file_exists:
-            writer.writerow(['Username', 'Password Hash', 'Name', 'Age', 'Phone', 'Website URL', 'Registration Date'])
-        
-        # Write user data
-        writer.writerow([
-            username,
-            password_hash.decode('utf-8'),
-            name,
-            age,
-            phone,
-            website_url,
-            datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        ])
+    # Appended through the directory, which writes the header if the file is new
+    users.append(_user_row(username, password_hash, name, age, phone, website_url))
 
 def init_db():
     conn = get_db_connection()
@@ -64,32 +149,39 @@ def register_user(username: str, password: str, name: str = None, age: int = Non
     """
     Register a new user by saving their data to CSV file.
     """
-    # Check if username already exists
-    if os.path.exists('users.csv'):
-        with open('users.csv', mode='r', newline='') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                if row['Username'] == username and not row['Website URL']:  # Only check main user accounts
-                    raise Exception('Username already exists')
+    # Check if username already exists before paying for the hash
+    if username in users:
+        raise Exception('Username already exists')
     
-    # Save to CSV file
-    save_to_csv(username, password, name, age, phone)
+    # Save to CSV file; add() checks again under the directory lock
+    if not users.add(username, _user_row(username, hash_password(password), name, age, phone)):
+        raise Exception('Username already exists')
+
+def update_password_hash(username: str, password_hash: bytes) -> None:
+    """
+    Replace a user's password hash in users.csv.
+    The file is rewritten to a temporary file and swapped in atomically.
+    """
+    users.update(username, {'Password Hash': password_hash.decode('utf-8')})
 
 def verify_user(username: str, password: str) -> bool:
     """
     Verify a user's credentials from CSV file.
     Returns True if the credentials are valid, False otherwise.
+    On success, a hash whose cost is outside the target band is
+    transparently replaced with one at the calibrated cost.
     """
-    if not os.path.exists('users.csv'):
+    user = users.get(username)
+    if user is None:
         return False
-        
-    with open('users.csv', mode='r', newline='') as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            if row['Username'] == username and not row['Website URL']:  # Only check main user accounts
-                stored_hash = row['Password Hash'].encode('utf-8')
-                return bcrypt.checkpw(password.encode('utf-8'), stored_hash)
-    return False
+    
+    stored_hash = user['Password Hash'].encode('utf-8')
+    if not check_password(password, stored_hash):
+        return False
+    
+    if needs_rehash(stored_hash):
+        update_password_hash(username, hash_password(password))
+    return True
 
 def get_user_by_username(username: str) -> Optional[dict]:
     """
@@ -115,8 +207,7 @@ def save_website_credentials(username: str, password: str, website_url: str) ->
     Save website credentials to data.csv file.
     """
     # Hash the password
-    salt = bcrypt.gensalt()
-    password_hash = bcrypt.hashpw(password.encode('utf-8'), salt)
+    password_hash = hash_password(password)
     
     # Create data.csv if it doesn't exist
     csv_file = 'data.csv'
@@ -136,6 +227,3 @@ def save_website_credentials(username: str, password: str, website_url: str) ->
             password_hash.decode('utf-8'),
             datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         ])
-
-# Initialize the database when the module is imported
-init_db() 
\ No newline at end of file
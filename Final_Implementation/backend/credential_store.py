@@ -0,0 +1,429 @@
+import hashlib
+import math
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import vault
+from events import publish
+from domains import DomainTrie, registrable_domain
+from search_index import SearchIndex
+
+# How long a negative answer from the host filter is trusted before the
+# vault version is checked again to pick up writes from other processes.
+FILTER_REVALIDATE_SECONDS = float(os.getenv('FILTER_REVALIDATE_SECONDS', '2.0'))
+FILTER_ERROR_RATE = 0.01
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings using double hashing.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = FILTER_ERROR_RATE):
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def expected_error_rate(self) -> float:
+        return (1 - math.exp(-self.hash_count * self.count / self.size)) ** self.hash_count
+
+
+def _build_filter(hosts) -> BloomFilter:
+    # Keyed on registrable domains, so a lookup for any host under a saved
+    # domain passes and everything else is rejected up front
+    domains = {registrable_domain(host) for host in hosts}
+    bloom = BloomFilter(max(64, len(domains) * 2))
+    for domain in domains:
+        bloom.add(domain)
+    return bloom
+
+
+class HostIndex:
+    """
+    In-memory view of one user's vault rows, grouped by hostname, with a
+    reversed-label trie of the hostnames for domain matching, fronted by a
+    Bloom filter of their registrable domains.
+    """
+
+    def __init__(self, user_id: int, version: int, by_host: Dict[str, List[dict]],
+                 search: Optional[SearchIndex] = None):
+        self.user_id = user_id
+        self.version = version
+        self.by_host = by_host
+        self.hosts = _build_filter(by_host)
+        self.trie = DomainTrie(by_host)
+        # Built on the first search, then kept up to date by writes and
+        # carried over to the next index when the vault is reloaded
+        self.search = search
+        self.search_lock = threading.Lock()
+        # Writes applied through this index, so a search index built from
+        # a snapshot can tell whether it missed any
+        self.writes = 0
+        self.checked_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def add_host(self, host: str) -> None:
+        self.trie.add(host)
+        domain = registrable_domain(host)
+        if domain in self.hosts:
+            return
+        if self.hosts.count >= self.hosts.capacity:
+            self.hosts = _build_filter(self.by_host)
+        else:
+            self.hosts.add(domain)
+
+
+_indexes: Dict[str, HostIndex] = {}
+_indexes_lock = threading.Lock()
+
+_filter_stats = {
+    'lookups': 0,
+    'filtered': 0,
+    'passed': 0,
+    'false_positives': 0
+}
+
+
+def normalize_hostname(website_url: str) -> str:
+    """
+    Reduce a saved website value or URL to a lowercase hostname.
+    """
+    value = website_url.strip()
+    if '://' in value:
+        value = urlsplit(value).hostname or ''
+    else:
+        value = value.split('/', 1)[0].split(':', 1)[0]
+    return value.lower().rstrip('.')
+
+
+def get_user_id(email: str) -> int:
+    """
+    Return the vault user id for an email, creating the user row if needed.
+    """
+    index = _indexes.get(email)
+    if index is not None:
+        return index.user_id
+    return vault.get_or_create_user_id(email)
+
+
+def _load_index(email: str, previous: Optional[HostIndex] = None) -> HostIndex:
+    user_id = vault.get_or_create_user_id(email)
+    version = vault.get_vault_version(user_id)
+    by_host: Dict[str, List[dict]] = {}
+    rows = vault.fetch_encrypted_credentials(user_id)
+    for row in rows:
+        row['user_id'] = user_id
+        by_host.setdefault(normalize_hostname(row['website_url']), []).append(row)
+    search = previous.search if previous is not None else None
+    if search is not None:
+        # Only entries added, removed or renamed since are re-indexed
+        search.sync(rows)
+    return HostIndex(user_id, version, by_host, search)
+
+
+def _get_index(email: str) -> HostIndex:
+    """
+    Return the user's index, rebuilding it if the vault version changed.
+    """
+    index = _indexes.get(email)
+    if index is None or index.version != vault.get_vault_version(index.user_id):
+        index = _load_index(email, index)
+        with _indexes_lock:
+            _indexes[email] = index
+    else:
+        index.checked_at = time.monotonic()
+    return index
+
+
+def _index_for_lookup(email: str) -> HostIndex:
+    index = _indexes.get(email)
+    if index is None or time.monotonic() - index.checked_at > FILTER_REVALIDATE_SECONDS:
+        index = _get_index(email)
+    return index
+
+
+def _lookup(index: HostIndex, host: str) -> List[Tuple[dict, str]]:
+    # (row, match kind) pairs, most specific first
+    _filter_stats['lookups'] += 1
+    if registrable_domain(host) not in index.hosts:
+        _filter_stats['filtered'] += 1
+        return []
+
+    _filter_stats['passed'] += 1
+    matches = []
+    for matched_host, kind in index.trie.match(host):
+        matches.extend((row, kind) for row in index.by_host.get(matched_host, ()))
+    if not matches:
+        _filter_stats['false_positives'] += 1
+    return matches
+
+
+def find_credentials(email: str, website_url: str) -> List[dict]:
+    """
+    Return the stored rows for the given hostname and for other hosts
+    under the same registrable domain, most specific first: the exact
+    host, parent domains, its subdomains, then sibling subdomains.
+
+    Hostnames the user has nothing saved for are answered from the Bloom
+    filter without touching the database, as long as the index was
+    validated against the vault version within FILTER_REVALIDATE_SECONDS.
+    """
+    return [row for row, _ in _lookup(_index_for_lookup(email), normalize_hostname(website_url))]
+
+
+def find_credentials_versioned(email: str, website_url: str) -> Tuple[int, List[dict]]:
+    """
+    Like find_credentials(), but also return a vault version the rows are
+    at least as new as, for use with vault.get_changes_since().
+    """
+    index = _index_for_lookup(email)
+    # Read before the lookup, so a concurrent write can only make it older
+    version = max(index.version, 0)
+    return version, [row for row, _ in _lookup(index, normalize_hostname(website_url))]
+
+
+def find_credentials_cached(email: str, website_url: str) -> Optional[List[dict]]:
+    """
+    Like find_credentials(), but only answers from memory. Returns None
+    when the user's index is missing or due for revalidation, in which case
+    the caller should use find_credentials() where blocking is acceptable.
+    """
+    index = _indexes.get(email)
+    if index is None or time.monotonic() - index.checked_at > FILTER_REVALIDATE_SECONDS:
+        return None
+    return [row for row, _ in _lookup(index, normalize_hostname(website_url))]
+
+
+def find_credentials_batch(email: str, website_urls: List[str]) -> Dict[str, List[Tuple[dict, str]]]:
+    """
+    Look up several websites against a single validated index.
+    Returns a map of each requested value to its matching (row, kind)
+    pairs, where kind is one of domains.EXACT, PARENT, SUBDOMAIN or
+    SIBLING, so callers that fill in forms unattended can skip siblings.
+    """
+    index = _index_for_lookup(email)
+    return {url: _lookup(index, normalize_hostname(url)) for url in website_urls}
+
+
+def search_credentials(email: str, query: str, offset: int = 0, limit: int = 20) -> Tuple[int, List[dict]]:
+    """
+    Search the website and username of a user's entries.
+    Returns (total matches, rows for the requested page).
+    """
+    index = _index_for_lookup(email)
+    search = index.search or _build_search(index)
+    return search.search(query, offset, limit)
+
+
+def _build_search(index: HostIndex) -> SearchIndex:
+    # Built from a snapshot without index.lock, so writers are not held up;
+    # writes that land meanwhile are applied before it is published
+    with index.search_lock:
+        if index.search is not None:
+            return index.search
+        with index.lock:
+            rows = [row for rows in index.by_host.values() for row in rows]
+            writes = index.writes
+        search = SearchIndex(rows)
+        with index.lock:
+            if index.writes != writes:
+                search.sync(row for rows in index.by_host.values() for row in rows)
+            index.search = search
+        return search
+
+
+def credential_id(row: dict) -> int:
+    return row['id']
+
+
+def find_credential(email: str, website_url: str, entry_id: int) -> Optional[dict]:
+    """
+    Return the single stored row with the given id for a hostname, if any.
+    """
+    for row in find_credentials(email, website_url):
+        if str(row['id']) == str(entry_id):
+            return row
+    return None
+
+
+def decrypt_row(row: dict) -> str:
+    """
+    Decrypt the password of a row returned by find_credentials().
+    """
+    return vault.decrypt_password(row['encrypted_password'], row['user_id'])
+
+
+def filter_stats() -> Dict[str, float]:
+    """
+    Return lookup counters for the negative-lookup filter.
+
+    false_positive_rate is measured over lookups for unknown hostnames;
+    expected_false_positive_rate is the theoretical rate averaged over the
+    currently loaded filters.
+    """
+    stats = dict(_filter_stats)
+    negatives = stats['filtered'] + stats['false_positives']
+    stats['false_positive_rate'] = stats['false_positives'] / negatives if negatives else 0.0
+    indexes = list(_indexes.values())
+    stats['filters'] = len(indexes)
+    stats['filter_bytes'] = sum(len(index.hosts.bits) for index in indexes)
+    stats['expected_false_positive_rate'] = (
+        sum(index.hosts.expected_error_rate() for index in indexes) / len(indexes) if indexes else 0.0
+    )
+    return stats
+
+
+def add_credentials(email: str, website_url: str, username: str, password: str) -> bool:
+    """
+    Encrypt and save a credential unless one already exists for the same
+    website and username. Returns True if the row was written.
+    """
+    return add_credentials_batch(email, [(website_url, username, password)])[0]
+
+
+def add_credentials_batch(email: str, entries: List[Tuple[str, str, str]],
+                          encrypt_many: Optional[Callable[[int, List[str]], List[str]]] = None) -> List[bool]:
+    """
+    Save several (website_url, username, password) entries in one
+    transaction, skipping ones that already exist (including repeats within
+    the batch). Returns one flag per entry telling whether it was written.
+
+    encrypt_many(user_id, passwords) can be given to encrypt the new
+    entries in bulk, e.g. on a worker pool.
+    """
+    index = _get_index(email)
+
+    with index.lock:
+        pending = []
+        seen = set()
+        for website_url, username, password in entries:
+            host = normalize_hostname(website_url)
+            exists = (host, username) in seen or any(
+                row['username'] == username for row in index.by_host.get(host, ())
+            )
+            seen.add((host, username))
+            pending.append(None if exists else (host, username, password))
+
+        new_entries = [item for item in pending if item is not None]
+        if not new_entries:
+            return [False] * len(entries)
+        passwords = [password for _, _, password in new_entries]
+        if encrypt_many is not None:
+            encrypted = encrypt_many(index.user_id, passwords)
+        else:
+            encrypted = [vault.encrypt_password(password, index.user_id) for password in passwords]
+        to_insert = [
+            (host, username, encrypted_password)
+            for (host, username, _), encrypted_password in zip(new_entries, encrypted)
+        ]
+        row_ids = vault.insert_encrypted_credentials_batch(index.user_id, to_insert)
+
+        saved = []
+        inserted = iter(zip(to_insert, row_ids))
+        for item in pending:
+            if item is None:
+                saved.append(False)
+                continue
+            (host, username, encrypted_password), row_id = next(inserted)
+            saved.append(row_id is not None)
+            if row_id is None:
+                continue
+            row = {
+                'id': row_id,
+                'user_id': index.user_id,
+                'website_url': host,
+                'username': username,
+                'encrypted_password': encrypted_password
+            }
+            index.by_host.setdefault(host, []).append(row)
+            index.add_host(host)
+            if index.search is not None:
+                index.search.add(row)
+
+        _record_writes(email, index, sum(saved))
+    return saved
+
+
+def _record_writes(email: str, index: HostIndex, count: int) -> None:
+    # If another process also wrote in the meantime, leave the index
+    # stale so the next lookup reloads it
+    version = vault.get_vault_version(index.user_id)
+    index.version = version if version == index.version + count else -1
+    index.checked_at = time.monotonic()
+    index.writes += count
+    if count:
+        publish(email, 'vault', {'version': version})
+
+
+def update_credentials(email: str, website_url: str, entry_id: int, password: str) -> bool:
+    """
+    Change the password of an existing entry in place.
+    Returns False if there is no such entry for the hostname.
+    """
+    index = _get_index(email)
+
+    with index.lock:
+        row = find_credential(email, website_url, entry_id)
+        if row is None:
+            return False
+        encrypted_password = vault.encrypt_password(password, index.user_id)
+        updated = vault.update_encrypted_password(index.user_id, row['id'], encrypted_password)
+        if updated:
+            row['encrypted_password'] = encrypted_password
+        _record_writes(email, index, int(updated))
+    return updated
+
+
+def delete_credentials(email: str, website_url: str, entry_id: int) -> bool:
+    """
+    Delete an entry. Returns False if there is no such entry for the hostname.
+    """
+    index = _get_index(email)
+
+    with index.lock:
+        row = find_credential(email, website_url, entry_id)
+        if row is None:
+            return False
+        deleted = vault.delete_credential_row(index.user_id, row['id'])
+        if deleted:
+            host = normalize_hostname(row['website_url'])
+            rows = [other for other in index.by_host.get(host, ()) if other is not row]
+            if rows:
+                index.by_host[host] = rows
+            else:
+                # The domain stays in the Bloom filter until the next rebuild
+                index.by_host.pop(host, None)
+                index.trie.discard(host)
+            if index.search is not None:
+                index.search.remove(row['id'])
+        _record_writes(email, index, int(deleted))
+    return deleted
+
+
+def invalidate(email: str) -> None:
+    """
+    Drop the cached index for a user so the next lookup reloads it.
+    """
+    with _indexes_lock:
+        _indexes.pop(email, None)
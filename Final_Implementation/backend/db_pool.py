@@ -0,0 +1,233 @@
+import logging
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+
+DB_PATH = os.getenv('DB_PATH', 'password_manager.db')
+POOL_MAX_IDLE = int(os.getenv('DB_POOL_MAX_IDLE', '16'))
+COMPACT_INTERVAL_SECONDS = float(os.getenv('DB_COMPACT_INTERVAL_SECONDS', '60'))
+# Checkpoint and truncate the WAL once it grows past this size
+WAL_LIMIT_BYTES = int(os.getenv('DB_WAL_LIMIT_BYTES', str(4 * 1024 * 1024)))
+# Return free pages to the filesystem once they exceed this share of the file
+FREE_PAGE_RATIO = float(os.getenv('DB_FREE_PAGE_RATIO', '0.25'))
+
+PRAGMAS = (
+    'PRAGMA journal_mode = WAL',
+    'PRAGMA synchronous = NORMAL',
+    'PRAGMA cache_size = -8000',
+    'PRAGMA temp_store = MEMORY',
+    'PRAGMA busy_timeout = 5000',
+    f'PRAGMA journal_size_limit = {WAL_LIMIT_BYTES}',
+)
+
+log = logging.getLogger('pm.db')
+
+
+class PooledConnection:
+    """
+    Wrapper handed out by the pool. close() returns the underlying
+    connection to the pool instead of closing it; everything else is
+    delegated to the sqlite3 connection.
+    """
+
+    def __init__(self, pool: 'ConnectionPool', conn: sqlite3.Connection):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self._conn.__enter__()
+
+    def __exit__(self, *exc):
+        return self._conn.__exit__(*exc)
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._pool.release(self._conn)
+            self._conn = None
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of persistent SQLite connections.
+
+    Connections are opened once with WAL journaling and tuned pragmas and
+    then reused, so each keeps its prepared-statement cache warm. Idle
+    connections are kept on a LIFO free list; at most max_idle are kept,
+    extras are closed when released.
+    """
+
+    def __init__(self, path: str, max_idle: int = POOL_MAX_IDLE, cached_statements: int = 256):
+        self.path = path
+        self.max_idle = max_idle
+        self.cached_statements = cached_statements
+        self.lock = threading.Lock()
+        self.idle: List[sqlite3.Connection] = []
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.opened = 0
+        self.closed = 0
+        self.acquired = 0
+        self.reused = 0
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=5,
+            check_same_thread=False,
+            cached_statements=self.cached_statements
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def connection(self) -> PooledConnection:
+        with self.lock:
+            conn = self.idle.pop() if self.idle else None
+            self.acquired += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+            if conn is not None:
+                self.reused += 1
+            else:
+                self.opened += 1
+        if conn is None:
+            try:
+                conn = self._open()
+            except Exception:
+                with self.lock:
+                    self.in_use -= 1
+                    self.opened -= 1
+                raise
+        return PooledConnection(self, conn)
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        # Never hand a connection with an open transaction to the next caller
+        if conn.in_transaction:
+            conn.rollback()
+        with self.lock:
+            self.in_use -= 1
+            if len(self.idle) < self.max_idle:
+                self.idle.append(conn)
+                return
+            self.closed += 1
+        conn.close()
+
+    def close_all(self) -> None:
+        with self.lock:
+            idle, self.idle = self.idle, []
+            self.closed += len(idle)
+        for conn in idle:
+            conn.close()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Report pool utilisation.
+        """
+        with self.lock:
+            return {
+                'in_use': self.in_use,
+                'idle': len(self.idle),
+                'peak_in_use': self.peak_in_use,
+                'max_idle': self.max_idle,
+                'opened': self.opened,
+                'closed': self.closed,
+                'acquired': self.acquired,
+                'reused': self.reused
+            }
+
+
+class Compactor:
+    """
+    Background thread that keeps the database files bounded.
+
+    Writes only ever append to the WAL; SQLite's automatic checkpoints
+    copy pages back but leave the file at its largest size, and deleted
+    rows leave free pages behind in the main file. Every interval the
+    compactor truncates the WAL once it passes wal_limit bytes and runs
+    an incremental vacuum once free pages pass free_ratio of the file.
+    """
+
+    def __init__(self, pool: 'ConnectionPool', interval: float = COMPACT_INTERVAL_SECONDS,
+                 wal_limit: int = WAL_LIMIT_BYTES, free_ratio: float = FREE_PAGE_RATIO):
+        self.pool = pool
+        self.interval = interval
+        self.wal_limit = wal_limit
+        self.free_ratio = free_ratio
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        self.checkpoints = 0
+        self.vacuums = 0
+        self.errors = 0
+
+    def wal_size(self) -> int:
+        try:
+            return os.path.getsize(self.pool.path + '-wal')
+        except OSError:
+            return 0
+
+    def run_once(self) -> None:
+        conn = self.pool.connection()
+        try:
+            page_count = conn.execute('PRAGMA page_count').fetchone()[0]
+            free_pages = conn.execute('PRAGMA freelist_count').fetchone()[0]
+            if page_count and free_pages / page_count > self.free_ratio:
+                # execute() steps the pragma once, freeing a single page;
+                # executescript() runs it to completion
+                conn.executescript('PRAGMA incremental_vacuum;')
+                self.vacuums += 1
+            if self.wal_size() > self.wal_limit:
+                conn.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchone()
+                self.checkpoints += 1
+        finally:
+            conn.close()
+
+    def _loop(self) -> None:
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.run_once()
+            except sqlite3.Error as e:
+                # Busy or locked: try again on the next tick
+                self.errors += 1
+                log.warning('Compaction skipped: %s', e)
+
+    def start(self) -> None:
+        if self.thread is None or not self.thread.is_alive():
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._loop, name='db-compactor', daemon=True)
+            self.thread.start()
+
+    def stop(self) -> None:
+        self.stop_event.set()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'wal_bytes': self.wal_size(),
+            'checkpoints': self.checkpoints,
+            'vacuums': self.vacuums,
+            'errors': self.errors
+        }
+
+
+pool = ConnectionPool(DB_PATH)
+compactor = Compactor(pool)
+
+
+def get_connection() -> PooledConnection:
+    return pool.connection()
+
+
+def pool_stats() -> Dict[str, int]:
+    return pool.stats()
+
+
+def start_compactor() -> None:
+    compactor.start()
+
+
+def compactor_stats() -> Dict[str, int]:
+    return compactor.stats()
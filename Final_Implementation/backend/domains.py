@@ -0,0 +1,222 @@
+import os
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+PUBLIC_SUFFIX_LIST = os.getenv(
+    'PUBLIC_SUFFIX_LIST',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'public_suffix_list.dat')
+)
+
+# Match kinds, in ranking order
+EXACT = 'exact'
+PARENT = 'parent'
+SUBDOMAIN = 'subdomain'
+SIBLING = 'sibling'
+_KIND_RANK = {EXACT: 0, PARENT: 1, SUBDOMAIN: 2, SIBLING: 3}
+
+
+class PublicSuffixList:
+    """
+    Public suffix rules (plain, "*." wildcard and "!" exception) loaded
+    from a file in the publicsuffix.org format.
+    """
+
+    def __init__(self, rules: Set[str], wildcards: Set[str], exceptions: Set[str]):
+        self.rules = rules
+        self.wildcards = wildcards
+        self.exceptions = exceptions
+
+    @classmethod
+    def load(cls, path: str = PUBLIC_SUFFIX_LIST) -> 'PublicSuffixList':
+        rules, wildcards, exceptions = set(), set(), set()
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                rule = line.strip().split(' ', 1)[0].lower()
+                if not rule or rule.startswith('//'):
+                    continue
+                if rule.startswith('!'):
+                    exceptions.add(rule[1:])
+                elif rule.startswith('*.'):
+                    wildcards.add(rule[2:])
+                else:
+                    rules.add(rule)
+        return cls(rules, wildcards, exceptions)
+
+    def suffix_length(self, labels: List[str]) -> int:
+        """
+        Number of trailing labels of a hostname (split on dots) that form
+        its public suffix, or 0 if no rule matched. Unlike the list's
+        implicit "*" rule, an unlisted TLD is not assumed to be a suffix,
+        so nothing under it is treated as one site.
+        """
+        longest = 0
+        for i in range(len(labels)):
+            candidate = '.'.join(labels[i:])
+            size = len(labels) - i
+            if candidate in self.exceptions:
+                # "!www.ck" makes www.ck registrable: the suffix is "ck"
+                return size - 1
+            if candidate in self.rules:
+                longest = max(longest, size)
+            if i > 0 and candidate in self.wildcards:
+                longest = max(longest, size + 1)
+        return longest
+
+
+_suffix_list: Optional[PublicSuffixList] = None
+_suffix_list_lock = threading.Lock()
+
+
+def get_suffix_list() -> PublicSuffixList:
+    global _suffix_list
+    if _suffix_list is None:
+        with _suffix_list_lock:
+            if _suffix_list is None:
+                _suffix_list = PublicSuffixList.load()
+    return _suffix_list
+
+
+def _is_ip(host: str) -> bool:
+    return ':' in host or host.replace('.', '').isdigit()
+
+
+def domain_labels(host: str) -> List[str]:
+    """
+    Labels of a hostname from the top level down, e.g.
+    'accounts.example.com' -> ['com', 'example', 'accounts'].
+    IP addresses are kept whole, so they only ever match exactly.
+    """
+    if not host:
+        return []
+    if _is_ip(host):
+        return [host]
+    return host.split('.')[::-1]
+
+
+def registrable_depth(host: str) -> int:
+    """
+    Number of labels, counted from the top level, in the host's registrable
+    domain (public suffix plus one label). Hosts that are themselves a
+    public suffix, hosts under no listed suffix, single-label hosts and IPs
+    use their full length.
+    """
+    labels = domain_labels(host)
+    if len(labels) <= 1:
+        return len(labels)
+    suffix = get_suffix_list().suffix_length(labels[::-1])
+    if not suffix:
+        return len(labels)
+    return min(suffix + 1, len(labels))
+
+
+def registrable_domain(host: str) -> str:
+    """
+    'accounts.example.co.uk' -> 'example.co.uk'.
+    """
+    labels = domain_labels(host)
+    return '.'.join(labels[:registrable_depth(host)][::-1]) if len(labels) > 1 else host
+
+
+class _Node:
+    __slots__ = ('children', 'host')
+
+    def __init__(self):
+        self.children: Dict[str, '_Node'] = {}
+        self.host: Optional[str] = None
+
+
+class DomainTrie:
+    """
+    Hostnames keyed on their reversed labels, so every host under a
+    registrable domain shares one subtree.
+
+    Writes and matches are serialised on the trie's own lock, so a lookup
+    never walks a child dict while a batch save is inserting into it.
+    """
+
+    def __init__(self, hosts=()):
+        self.root = _Node()
+        self.lock = threading.Lock()
+        for host in hosts:
+            self.add(host)
+
+    def add(self, host: str) -> None:
+        labels = domain_labels(host)
+        with self.lock:
+            node = self.root
+            for label in labels:
+                node = node.children.setdefault(label, _Node())
+            node.host = host
+
+    def discard(self, host: str) -> None:
+        # Empty nodes are left in place; they are dropped when the trie is rebuilt
+        labels = domain_labels(host)
+        with self.lock:
+            node = self.root
+            for label in labels:
+                node = node.children.get(label)
+                if node is None:
+                    return
+            node.host = None
+
+    def _find(self, labels: List[str]) -> Optional[str]:
+        node = self.root
+        for label in labels:
+            node = node.children.get(label)
+            if node is None:
+                return None
+        return node.host
+
+    def match(self, host: str) -> List[Tuple[str, str]]:
+        """
+        Return (stored_host, kind) pairs for hosts within the same
+        registrable domain as host, most specific first: the exact host,
+        then parent domains from the closest up, then subdomains of host,
+        then other subdomains of the registrable domain. Walking to the
+        host costs one step per label; only the matching subtree is visited
+        beyond that.
+        """
+        labels = domain_labels(host)
+        floor = registrable_depth(host)
+        suffix = get_suffix_list().suffix_length(labels[::-1])
+        with self.lock:
+            if not suffix or suffix >= len(labels):
+                # A bare public suffix ("co.uk"), a host under no listed
+                # suffix, a single-label host or an IP only matches itself
+                stored = self._find(labels)
+                return [(stored, EXACT)] if stored is not None else []
+            matches = self._match(labels, floor)
+        matches.sort()
+        return [(stored, kind) for _, _, stored, kind in matches]
+
+    def _match(self, labels: List[str], floor: int) -> List[Tuple[int, int, str, str]]:
+        matches: List[Tuple[int, int, str, str]] = []
+
+        node = self.root
+        path = []
+        for depth, label in enumerate(labels, 1):
+            node = node.children.get(label)
+            if node is None:
+                break
+            path.append(node)
+            if depth >= floor and node.host is not None:
+                kind = EXACT if depth == len(labels) else PARENT
+                matches.append((_KIND_RANK[kind], len(labels) - depth, node.host, kind))
+
+        if len(path) >= floor:
+            # Everything below the registrable domain that is not on the path
+            on_path = {id(n) for n in path}
+            exact_node = path[-1] if len(path) == len(labels) else None
+            stack = [(path[floor - 1], floor, False)]
+            while stack:
+                current, depth, below_exact = stack.pop()
+                for child in current.children.values():
+                    if id(child) in on_path:
+                        stack.append((child, depth + 1, below_exact))
+                        continue
+                    inside = below_exact or current is exact_node
+                    if child.host is not None:
+                        kind = SUBDOMAIN if inside else SIBLING
+                        matches.append((_KIND_RANK[kind], depth + 1, child.host, kind))
+                    stack.append((child, depth + 1, inside))
+        return matches
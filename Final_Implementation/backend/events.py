@@ -0,0 +1,149 @@
+import asyncio
+import json
+import os
+import queue
+import threading
+from typing import Dict, Optional, Set, Tuple
+
+EVENT_QUEUE_SIZE = int(os.getenv('EVENT_QUEUE_SIZE', '64'))
+# Comment lines sent on idle streams so proxies and clients keep them open
+EVENT_HEARTBEAT_SECONDS = float(os.getenv('EVENT_HEARTBEAT_SECONDS', '15'))
+
+Event = Tuple[str, Optional[dict]]
+
+
+def format_event(event: str, data: Optional[dict] = None) -> str:
+    """
+    Encode one server-sent event.
+    """
+    return f'event: {event}\ndata: {json.dumps(data or {})}\n\n'
+
+
+class Subscription:
+    """
+    One connected client. deliver() is called from the publishing thread
+    and must never block; when the client's queue is full the event is
+    dropped and overflowed is set, so the stream can tell the client to
+    resync instead.
+    """
+
+    def __init__(self, session_token: Optional[str] = None):
+        self.session_token = session_token
+        self.overflowed = False
+
+    def deliver(self, event: Event) -> None:
+        raise NotImplementedError
+
+
+class ThreadSubscription(Subscription):
+    """
+    Subscription read by a blocking request thread (the Flask server).
+    """
+
+    def __init__(self, session_token: Optional[str] = None, maxsize: int = EVENT_QUEUE_SIZE):
+        super().__init__(session_token)
+        self.queue: 'queue.Queue[Event]' = queue.Queue(maxsize)
+
+    def deliver(self, event: Event) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout: float = EVENT_HEARTBEAT_SECONDS) -> Optional[Event]:
+        """
+        Wait for the next event; None after timeout seconds of silence.
+        """
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class AsyncSubscription(Subscription):
+    """
+    Subscription read by a coroutine (the ASGI server). Events published
+    from worker threads are handed to the event loop thread-safely.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, session_token: Optional[str] = None,
+                 maxsize: int = EVENT_QUEUE_SIZE):
+        super().__init__(session_token)
+        self.loop = loop
+        self.queue: 'asyncio.Queue[Event]' = asyncio.Queue(maxsize)
+
+    def _put(self, event: Event) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    def deliver(self, event: Event) -> None:
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # Loop already closed; the stream is going away
+            pass
+
+    async def get(self, timeout: float = EVENT_HEARTBEAT_SECONDS) -> Optional[Event]:
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventBroker:
+    """
+    Per-user fan-out of session and vault events.
+
+    Subscribers are grouped by email, so publishing costs one dict lookup
+    plus one non-blocking put per connected client of that user, however
+    many other users are connected.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers: Dict[str, Set[Subscription]] = {}
+        self.published = 0
+        self.delivered = 0
+
+    def subscribe(self, email: str, subscription: Subscription) -> None:
+        with self.lock:
+            self.subscribers.setdefault(email, set()).add(subscription)
+
+    def unsubscribe(self, email: str, subscription: Subscription) -> None:
+        with self.lock:
+            subscribers = self.subscribers.get(email)
+            if subscribers is None:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self.subscribers[email]
+
+    def publish(self, email: str, event: str, data: Optional[dict] = None) -> None:
+        with self.lock:
+            targets = list(self.subscribers.get(email, ()))
+            self.published += 1
+            self.delivered += len(targets)
+        for subscription in targets:
+            subscription.deliver((event, data))
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {
+                'users': len(self.subscribers),
+                'subscribers': sum(len(subscribers) for subscribers in self.subscribers.values()),
+                'published': self.published,
+                'delivered': self.delivered
+            }
+
+
+broker = EventBroker()
+
+
+def publish(email: str, event: str, data: Optional[dict] = None) -> None:
+    broker.publish(email, event, data)
+
+
+def event_stats() -> Dict[str, int]:
+    return broker.stats()
@@ -0,0 +1,139 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, TypeVar
+
+T = TypeVar('T')
+
+HASH_WORKERS = int(os.getenv('HASH_WORKERS', str(max(1, (os.cpu_count() or 2) // 2))))
+HASH_QUEUE_LIMIT = int(os.getenv('HASH_QUEUE_LIMIT', '32'))
+HASH_TIMEOUT_SECONDS = float(os.getenv('HASH_TIMEOUT_SECONDS', '10'))
+
+
+class HashingOverloaded(Exception):
+    """
+    Raised when the hashing pool's queue is full, or a call waited longer
+    than its timeout. Callers should answer with 503 rather than wait.
+    """
+
+
+class LatencyStats:
+    """
+    Count/total/max plus a window of recent samples for percentiles.
+    """
+
+    def __init__(self, window: int = 1024):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def summary(self) -> Dict[str, float]:
+        ordered = sorted(self.samples)
+
+        def percentile(p):
+            return ordered[min(len(ordered) - 1, int(p * len(ordered)))] if ordered else 0.0
+
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'max': self.max,
+            'p50': percentile(0.50),
+            'p95': percentile(0.95),
+            'p99': percentile(0.99)
+        }
+
+
+class HashingPool:
+    """
+    Dedicated executor for password hashing (bcrypt, PBKDF2, scrypt).
+
+    At most max_workers hashes run at once, which caps how many cores
+    login and registration bursts can take away from autofill requests;
+    bcrypt and hashlib release the GIL while hashing, so other request
+    threads keep running. At most max_queue further calls may wait; beyond
+    that run() fails immediately with HashingOverloaded, and so does a call
+    still unfinished after its timeout.
+    """
+
+    def __init__(self, max_workers: int = HASH_WORKERS, max_queue: int = HASH_QUEUE_LIMIT):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='hashing')
+        self.slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.queue_wait = LatencyStats()
+        self.run_time = LatencyStats()
+
+    def run(self, fn: Callable[..., T], *args, timeout: float = HASH_TIMEOUT_SECONDS) -> T:
+        """
+        Run fn(*args) on the pool and wait for its result.
+        """
+        if not self.slots.acquire(blocking=False):
+            with self.lock:
+                self.rejected += 1
+            raise HashingOverloaded('Password hashing queue is full')
+
+        submitted = time.perf_counter()
+        with self.lock:
+            self.pending += 1
+
+        def task():
+            started = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                finished = time.perf_counter()
+                with self.lock:
+                    self.queue_wait.add(started - submitted)
+                    self.run_time.add(finished - started)
+
+        def done(_):
+            with self.lock:
+                self.pending -= 1
+            self.slots.release()
+
+        future = self.executor.submit(task)
+        future.add_done_callback(done)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            # The hash keeps its slot until it finishes, so the queue stays bounded
+            with self.lock:
+                self.timed_out += 1
+            raise HashingOverloaded('Password hashing timed out') from None
+
+    def stats(self) -> Dict[str, object]:
+        with self.lock:
+            return {
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'pending': self.pending,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+                'queue_wait': self.queue_wait.summary(),
+                'run_time': self.run_time.summary()
+            }
+
+
+pool = HashingPool()
+
+
+def run_hash(fn: Callable[..., T], *args) -> T:
+    return pool.run(fn, *args)
+
+
+def hashing_stats() -> Dict[str, object]:
+    return pool.stats()
@@ -0,0 +1,138 @@
+import argparse
+import csv
+import io
+import sys
+import time
+from concurrent.futures import Executor
+from typing import Callable, Dict, Iterable, Iterator, Optional, TextIO, Tuple
+
+from auth import init_db
+from credential_store import add_credentials_batch, normalize_hostname
+from parallel_crypto import DEFAULT_WORKERS, create_executor, encrypt_many
+from vault import get_encryption_key, init_vault
+
+# Header names used by the common password manager exports
+# (Chrome/Edge, Firefox, Safari, Bitwarden, LastPass, 1Password)
+URL_COLUMNS = ('url', 'login_uri', 'website', 'origin', 'hostname')
+USERNAME_COLUMNS = ('username', 'login_username', 'login', 'email')
+PASSWORD_COLUMNS = ('password', 'login_password')
+
+IMPORT_BATCH_SIZE = 500
+
+
+def detect_columns(fieldnames: Optional[Iterable[str]]) -> Tuple[str, str, str]:
+    """
+    Find the url, username and password columns of an export file.
+    Raises ValueError if any of them is missing.
+    """
+    by_lower = {name.strip().lower(): name for name in fieldnames or ()}
+
+    def pick(candidates, label):
+        for candidate in candidates:
+            if candidate in by_lower:
+                return by_lower[candidate]
+        raise ValueError(f'No {label} column found (expected one of: {", ".join(candidates)})')
+
+    return (
+        pick(URL_COLUMNS, 'url'),
+        pick(USERNAME_COLUMNS, 'username'),
+        pick(PASSWORD_COLUMNS, 'password')
+    )
+
+
+def iter_export_rows(stream: TextIO, stats: Dict[str, int]) -> Iterator[Tuple[str, str, str]]:
+    """
+    Yield (hostname, username, password) from an export file one row at a
+    time. Rows without a usable url, username or password are counted in
+    stats['invalid'] and skipped.
+    """
+    reader = csv.DictReader(stream)
+    url_col, username_col, password_col = detect_columns(reader.fieldnames)
+    for row in reader:
+        stats['read'] += 1
+        host = normalize_hostname(row.get(url_col) or '')
+        username = (row.get(username_col) or '').strip()
+        password = row.get(password_col) or ''
+        if not host or not username or not password:
+            stats['invalid'] += 1
+            continue
+        yield host, username, password
+
+
+def import_credentials(email: str, stream: TextIO, batch_size: int = IMPORT_BATCH_SIZE,
+                       workers: int = DEFAULT_WORKERS,
+                       progress: Optional[Callable[[Dict[str, int]], None]] = None,
+                       executor: Optional[Executor] = None) -> Dict[str, int]:
+    """
+    Import a browser password export into a user's vault.
+
+    The file is streamed and committed in batches of batch_size rows, so
+    memory use does not grow with the file. Duplicates are detected
+    against the user's in-memory hostname index, and new passwords are
+    encrypted on executor if one is given, otherwise on a pool of
+    processes created for this import. progress, if given, is called with
+    the running counters after every batch.
+    """
+    stats = {'read': 0, 'imported': 0, 'duplicates': 0, 'invalid': 0}
+    own_executor = executor is None
+    if own_executor:
+        executor = create_executor(workers)
+
+    def encrypt_batch(user_id, passwords):
+        return encrypt_many(get_encryption_key(user_id), passwords, executor)
+
+    def commit(batch):
+        saved = add_credentials_batch(email, batch, encrypt_many=encrypt_batch)
+        imported = sum(saved)
+        stats['imported'] += imported
+        stats['duplicates'] += len(batch) - imported
+        batch.clear()
+        if progress is not None:
+            progress(dict(stats))
+
+    try:
+        batch = []
+        for entry in iter_export_rows(stream, stats):
+            batch.append(entry)
+            if len(batch) >= batch_size:
+                commit(batch)
+        if batch:
+            commit(batch)
+    finally:
+        if own_executor and executor is not None:
+            executor.shutdown()
+    return stats
+
+
+def open_export(binary: io.BufferedIOBase) -> TextIO:
+    """
+    Wrap a binary upload or file for csv reading, dropping a UTF-8 BOM.
+    """
+    return io.TextIOWrapper(binary, encoding='utf-8-sig', newline='')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Import a browser password export (CSV) into a user\'s vault.')
+    parser.add_argument('email', help='account to import into')
+    parser.add_argument('file', help='exported CSV file, or - for stdin')
+    parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE, help='rows per transaction')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='encryption worker processes')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+
+    def report(stats):
+        elapsed = time.perf_counter() - started
+        print(f"{stats['read']} rows read, {stats['imported']} imported, "
+              f"{stats['duplicates']} duplicates, {stats['invalid']} invalid "
+              f"({stats['read'] / elapsed:.0f} rows/s)")
+
+    init_db()
+    init_vault()
+
+    if args.file == '-':
+        import_credentials(args.email, open_export(sys.stdin.buffer), args.batch_size, args.workers, report)
+    else:
+        with open(args.file, 'rb') as f:
+            import_credentials(args.email, open_export(f), args.batch_size, args.workers, report)
+    print(f"Done in {time.perf_counter() - started:.2f}s")
@@ -0,0 +1,168 @@
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+# Per-logger overrides, e.g. "pm.session=DEBUG,werkzeug=WARNING"
+LOG_LEVELS = os.getenv('LOG_LEVELS', '')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+# Records per second let through for each message at INFO and below; 0 disables sampling
+LOG_SAMPLE_RATE = int(os.getenv('LOG_SAMPLE_RATE', '10'))
+
+# Attributes every LogRecord has; anything else was passed with extra=
+_RECORD_ATTRS = set(logging.LogRecord('', 0, '', 0, '', (), None).__dict__) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: time, level, logger, message, any fields
+    passed with extra= and the traceback if there was one.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class RateSampler(logging.Filter):
+    """
+    Lets at most rate records per second through for each (logger,
+    message template) pair at INFO and below; warnings and errors always
+    pass. The first record let through in the next second carries the
+    number skipped in sampled_out.
+
+    Pairs are keyed on the unformatted message, so log with %-style
+    arguments rather than f-strings to keep the table bounded by the
+    number of call sites.
+    """
+
+    def __init__(self, rate: int = LOG_SAMPLE_RATE):
+        super().__init__()
+        self.rate = rate
+        self.lock = threading.Lock()
+        # (logger, template) -> [second, passed, skipped]
+        self.windows: Dict[Tuple[str, str], list] = {}
+        self.skipped = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate <= 0 or record.levelno > logging.INFO:
+            return True
+        key = (record.name, str(record.msg))
+        second = int(record.created)
+        with self.lock:
+            window = self.windows.get(key)
+            if window is None or window[0] != second:
+                if window is not None and window[2]:
+                    record.sampled_out = window[2]
+                self.windows[key] = [second, 1, 0]
+                return True
+            if window[1] < self.rate:
+                window[1] += 1
+                return True
+            window[2] += 1
+            self.skipped += 1
+            return False
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the listener thread without ever waiting: when the
+    queue is full the record is dropped and counted instead.
+    """
+
+    def __init__(self, maxsize: int = LOG_QUEUE_SIZE):
+        super().__init__(queue.Queue(maxsize))
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only merge the arguments here; formatting happens on the listener thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def parse_levels(spec: str) -> Dict[str, str]:
+    levels = {}
+    for item in spec.split(','):
+        name, _, level = item.partition('=')
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+_handler: Optional[NonBlockingQueueHandler] = None
+_sampler: Optional[RateSampler] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def setup_logging() -> None:
+    """
+    Route the root logger through a bounded queue drained by a background
+    thread that writes to stdout, so request threads never block on
+    console I/O. Safe to call more than once.
+    """
+    global _handler, _sampler, _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    if LOG_FORMAT == 'json':
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+
+    _sampler = RateSampler()
+    _handler = NonBlockingQueueHandler()
+    _handler.addFilter(_sampler)
+
+    root = logging.getLogger()
+    root.addHandler(_handler)
+    root.setLevel(LOG_LEVEL.upper())
+    for name, level in parse_levels(LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(_handler.queue, output, respect_handler_level=True)
+    _listener.start()
+    # Flush what is still queued on a clean shutdown
+    atexit.register(_listener.stop)
+
+
+def log_stats() -> Dict[str, int]:
+    if _handler is None:
+        return {'queued': 0, 'dropped': 0, 'sampled_out': 0}
+    return {
+        'queued': _handler.queue.qsize(),
+        'dropped': _handler.dropped,
+        'sampled_out': _sampler.skipped
+    }
@@ -0,0 +1,173 @@
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# Seconds; covers in-memory lookups (tens of microseconds) up to slow bcrypt
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0
+)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """
+    Monotonic counter, optionally split by label values.
+    """
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self.lock:
+            items = sorted(self.values.items())
+        for labels, value in items:
+            lines.append(f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}')
+        return lines
+
+
+class Histogram:
+    """
+    Latency histogram with fixed buckets, optionally split by label values.
+    observe() is a bisect and three increments; cumulative bucket counts
+    are only worked out when the histogram is rendered.
+    """
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        # labels -> [per-bucket counts (+1 for +Inf), sum, count]
+        self.series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, *labels: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self.lock:
+            items = sorted((labels, (list(s[0]), s[1], s[2])) for labels, s in self.series.items())
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = 'le="+Inf"' if bound == float('inf') else f'le="{bound!r}"'
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {count}')
+        return lines
+
+
+request_seconds = Histogram(
+    'pm_request_duration_seconds', 'Time spent handling HTTP requests.', ('route', 'method')
+)
+requests_total = Counter(
+    'pm_requests_total', 'HTTP requests by route and status code.', ('route', 'method', 'status')
+)
+stage_seconds = Histogram(
+    'pm_stage_duration_seconds',
+    'Time spent in internal stages: session, db_read, db_write, encrypt, decrypt, bcrypt.',
+    ('stage',)
+)
+credential_lookups_total = Counter(
+    'pm_credential_lookups_total', 'Credential lookups by result (hit or miss).', ('endpoint', 'result')
+)
+
+# prefix -> (help, callable returning {name: value}) for gauges read only at scrape time
+_collectors: Dict[str, Tuple[str, Callable[[], Dict[str, float]]]] = {}
+
+
+def stage(name: str):
+    """
+    Decorator recording each call's duration under pm_stage_duration_seconds.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                stage_seconds.observe(time.perf_counter() - started, name)
+        return wrapper
+    return decorator
+
+
+def register_collector(prefix: str, help_text: str, collect: Callable[[], Dict[str, float]]) -> None:
+    """
+    Export the numeric values of collect() as gauges named prefix_<key>.
+    collect is only called when /metrics is scraped. Registering the same
+    prefix again replaces the earlier collector.
+    """
+    _collectors[prefix] = (help_text, collect)
+
+
+def _render_collector(prefix: str, help_text: str, collect: Callable[[], Dict[str, float]]) -> List[str]:
+    lines = []
+
+    def walk(name: str, value):
+        if isinstance(value, dict):
+            for key, nested in value.items():
+                walk(f'{name}_{key}', nested)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} gauge')
+            lines.append(f'{name} {_number(value)}')
+
+    walk(prefix, collect())
+    return lines
+
+
+def render() -> str:
+    """
+    Render every metric in the Prometheus text exposition format.
+    """
+    lines: List[str] = []
+    for metric in (request_seconds, requests_total, stage_seconds, credential_lookups_total):
+        lines.extend(metric.render())
+    for prefix, (help_text, collect) in list(_collectors.items()):
+        lines.extend(_render_collector(prefix, help_text, collect))
+    return '\n'.join(lines) + '\n'
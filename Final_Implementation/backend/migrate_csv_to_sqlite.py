@@ -0,0 +1,104 @@
+import argparse
+import csv
+import glob
+import os
+import sqlite3
+import time
+
+from cryptography.fernet import Fernet
+
+from auth import init_db
+from credential_store import normalize_hostname
+from vault import init_vault, get_db_connection, get_or_create_user_id, encrypt_password
+
+LEGACY_KEY_FILE = 'data/key.key'
+CREDENTIALS_GLOB = 'data/credentials_*.csv'
+
+
+def load_legacy_cipher(key_file: str) -> Fernet:
+    """
+    Load the Fernet key the CSV store used for every user.
+    """
+    with open(key_file, 'rb') as f:
+        return Fernet(f.read())
+
+
+def email_from_path(path: str) -> str:
+    name = os.path.basename(path)
+    return name[len('credentials_'):-len('.csv')]
+
+
+def migrate_file(conn: sqlite3.Connection, path: str, cipher: Fernet, batch_size: int) -> tuple:
+    """
+    Stream one user's CSV into the credentials table.
+
+    Rows are re-encrypted with the user's vault key and written in
+    transactions of batch_size rows, so the server only ever waits on one
+    short write lock. Entries that already exist are skipped, which makes
+    the migration safe to re-run.
+    Returns (rows_read, rows_inserted).
+    """
+    email = email_from_path(path)
+    user_id = get_or_create_user_id(email)
+
+    read = inserted = 0
+    batch = []
+
+    def flush():
+        nonlocal inserted
+        with conn:
+            cursor = conn.executemany(
+                '''
+                INSERT OR IGNORE INTO credentials (user_id, website_url, username, encrypted_password)
+                VALUES (?, ?, ?, ?)
+                ''',
+                batch
+            )
+            inserted += cursor.rowcount
+        batch.clear()
+
+    with open(path, 'r', newline='') as f:
+        for row in csv.DictReader(f):
+            read += 1
+            password = cipher.decrypt(row['encrypted_password'].encode()).decode()
+            batch.append((
+                user_id,
+                normalize_hostname(row['website_url']),
+                row['username_or_email'],
+                encrypt_password(password, user_id)
+            ))
+            if len(batch) >= batch_size:
+                flush()
+    if batch:
+        flush()
+    return read, inserted
+
+
+def migrate(pattern: str, key_file: str, batch_size: int) -> None:
+    init_db()
+    init_vault()
+    cipher = load_legacy_cipher(key_file)
+    conn = get_db_connection()
+
+    total_read = total_inserted = 0
+    started = time.perf_counter()
+    try:
+        for path in sorted(glob.glob(pattern)):
+            read, inserted = migrate_file(conn, path, cipher, batch_size)
+            total_read += read
+            total_inserted += inserted
+            print(f"{email_from_path(path)}: {read} rows read, {inserted} inserted")
+    finally:
+        conn.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"Done: {total_read} rows read, {total_inserted} inserted in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Copy per-user credential CSV files into the SQLite vault.')
+    parser.add_argument('--pattern', default=CREDENTIALS_GLOB, help='glob of credential CSV files')
+    parser.add_argument('--key-file', default=LEGACY_KEY_FILE, help='Fernet key used by the CSV store')
+    parser.add_argument('--batch-size', type=int, default=500, help='rows per transaction')
+    args = parser.parse_args()
+    migrate(args.pattern, args.key_file, args.batch_size)
@@ -0,0 +1,121 @@
+import concurrent.futures
+import os
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import List, Optional, Sequence, Union
+
+from cryptography.fernet import Fernet, MultiFernet
+
+from metrics import stage
+
+DEFAULT_WORKERS = int(os.getenv('CRYPTO_WORKERS', str(os.cpu_count() or 1)))
+DEFAULT_CHUNK_SIZE = int(os.getenv('CRYPTO_CHUNK_SIZE', '256'))
+# 'process' or 'thread', for pools the command-line tools create
+DEFAULT_EXECUTOR = os.getenv('CRYPTO_EXECUTOR', 'process')
+# Kind of the server's long-lived pool. Processes, started from a
+# forkserver since forking a server that already runs threads can deadlock.
+# Fernet holds the GIL, so a thread pool would only add overhead: 'thread'
+# (or 'none') turns the shared pool off and request-time work runs serially
+SHARED_EXECUTOR = os.getenv('CRYPTO_SHARED_EXECUTOR', 'process')
+
+Cipher = Union[Fernet, MultiFernet]
+# One key, or several with the encryption key first
+Keys = Union[bytes, Sequence[bytes]]
+
+_shared_executor: Optional[Executor] = None
+_shared_executor_lock = threading.Lock()
+
+
+def make_cipher(keys: Keys) -> Cipher:
+    """
+    Fernet for one key; MultiFernet for several, which encrypts with the
+    first and decrypts with whichever matches.
+    """
+    if isinstance(keys, bytes):
+        return Fernet(keys)
+    if len(keys) == 1:
+        return Fernet(keys[0])
+    return MultiFernet([Fernet(key) for key in keys])
+
+
+def _encrypt_chunk(key: Keys, values: List[str]) -> List[str]:
+    f = make_cipher(key)
+    return [f.encrypt(value.encode()).decode() for value in values]
+
+
+def _decrypt_chunk(key: Keys, tokens: List[str]) -> List[str]:
+    f = make_cipher(key)
+    return [f.decrypt(token.encode()).decode() for token in tokens]
+
+
+def _chunks(values: List[str], chunk_size: int):
+    for start in range(0, len(values), chunk_size):
+        yield values[start:start + chunk_size]
+
+
+def create_executor(workers: int = DEFAULT_WORKERS, kind: str = DEFAULT_EXECUTOR,
+                    start_method: Optional[str] = None) -> Optional[Executor]:
+    """
+    Create a pool for Fernet work, or None when running serially.
+    Fernet holds the GIL for most of its work, so process pools are the
+    default; thread pools avoid the pickling cost for small chunks.
+    start_method picks how process workers are started (see
+    multiprocessing); the platform default when None.
+    """
+    if workers <= 1:
+        return None
+    if kind == 'thread':
+        return ThreadPoolExecutor(max_workers=workers)
+    # Looked up here: importing the process pool pulls in multiprocessing
+    import multiprocessing
+    context = multiprocessing.get_context(start_method) if start_method else None
+    return concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=context)
+
+
+def get_shared_executor() -> Optional[Executor]:
+    """
+    Return the long-lived pool used for request-time work, creating it on
+    first use with CRYPTO_WORKERS / CRYPTO_SHARED_EXECUTOR. None when that
+    work should run serially: one worker, or no process pool.
+    """
+    global _shared_executor
+    if DEFAULT_WORKERS <= 1 or SHARED_EXECUTOR != 'process':
+        return None
+    with _shared_executor_lock:
+        if _shared_executor is None:
+            import multiprocessing
+            start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else None
+            _shared_executor = create_executor(DEFAULT_WORKERS, 'process', start_method)
+        return _shared_executor
+
+
+def _map_chunks(fn, key: Keys, values: List[str], executor: Optional[Executor], chunk_size: int) -> List[str]:
+    if executor is None or len(values) <= chunk_size:
+        return fn(key, values)
+    keys = [key] * ((len(values) + chunk_size - 1) // chunk_size)
+    results: List[str] = []
+    # Executor.map yields in submission order, so output order matches input
+    for chunk in executor.map(fn, keys, _chunks(values, chunk_size)):
+        results.extend(chunk)
+    return results
+
+
+@stage('encrypt')
+def encrypt_many(key: Keys, values: List[str], executor: Optional[Executor] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE) -> List[str]:
+    """
+    Encrypt values with a Fernet key, spreading chunks over the executor.
+    Output order matches input order.
+    """
+    return _map_chunks(_encrypt_chunk, key, values, executor, chunk_size)
+
+
+@stage('decrypt')
+def decrypt_many(key: Keys, tokens: List[str], executor: Optional[Executor] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE) -> List[str]:
+    """
+    Decrypt Fernet tokens with one key or any of several, spreading
+    chunks over the executor.
+    Output order matches input order.
+    """
+    return _map_chunks(_decrypt_chunk, key, tokens, executor, chunk_size)
@@ -0,0 +1,80 @@
+import argparse
+import os
+import sqlite3
+import time
+
+from auth import init_db
+from parallel_crypto import make_cipher
+from vault import (
+    KDF_N, KDF_P, KDF_R, derive_key, get_db_connection, get_kdf_params, get_legacy_key, init_vault
+)
+
+
+def rekey_user(conn: sqlite3.Connection, user_id: int) -> int:
+    """
+    Re-encrypt every entry of one user under a key derived with a fresh
+    salt and the configured scrypt cost.
+
+    Entries may be under the user's current scrypt key or the legacy key;
+    both are accepted. The write lock is taken before reading, and the new
+    salt is stored in the same transaction as the re-encrypted rows, so a
+    vault is never left half converted.
+    Returns the number of entries re-encrypted.
+    """
+    salt = os.urandom(16)
+    new_key = derive_key(salt, KDF_N, KDF_R, KDF_P)
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        old_key = derive_key(*get_kdf_params(user_id, conn))
+        cipher = make_cipher((new_key, old_key, get_legacy_key(user_id)))
+        rows = conn.execute(
+            'SELECT id, encrypted_password FROM credentials WHERE user_id = ?', (user_id,)
+        ).fetchall()
+        conn.executemany(
+            'UPDATE credentials SET encrypted_password = ? WHERE id = ?',
+            [(cipher.rotate(row['encrypted_password'].encode()).decode(), row['id']) for row in rows]
+        )
+        conn.execute(
+            'UPDATE vault_keys SET salt = ?, n = ?, r = ?, p = ? WHERE user_id = ?',
+            (salt, KDF_N, KDF_R, KDF_P, user_id)
+        )
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return len(rows)
+
+
+def rekey(emails: list) -> None:
+    init_db()
+    init_vault()
+    conn = get_db_connection()
+
+    total = 0
+    started = time.perf_counter()
+    try:
+        if emails:
+            users = conn.execute(
+                f"SELECT id, username FROM users WHERE username IN ({','.join('?' * len(emails))})", emails
+            ).fetchall()
+        else:
+            users = conn.execute('SELECT id, username FROM users ORDER BY id').fetchall()
+        for user in users:
+            count = rekey_user(conn, user['id'])
+            total += count
+            print(f"{user['username']}: {count} entries re-encrypted")
+    finally:
+        conn.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"Done: {len(users)} users, {total} entries in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Re-encrypt vault entries under scrypt-derived keys with the configured cost. '
+                    'Stop the server first: it caches the old keys.'
+    )
+    parser.add_argument('emails', nargs='*', help='only these users (default: everyone)')
+    args = parser.parse_args()
+    rekey(args.emails)
@@ -0,0 +1,210 @@
+import bisect
+import heapq
+import threading
+from typing import Callable, Dict, Iterable, List, Set, Tuple
+
+# Grams of every length up to this are indexed, so one- and two-character
+# queries are answered from the postings as well
+MAX_GRAM = 3
+
+# (website, username, id): the order results are listed in within a rank
+Key = Tuple[str, str, int]
+
+
+def _grams(text: str, n: int) -> Set[str]:
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def _all_grams(text: str) -> Set[str]:
+    return {text[i:i + n] for n in range(1, MAX_GRAM + 1) for i in range(len(text) - n + 1)}
+
+
+def _prefix_grams(host: str, username: str) -> Set[str]:
+    # Up to MAX_GRAM characters from the start of each field and of every
+    # hostname label: the queries that count as prefix matches
+    starts = [(host, 0), (username, 0)] + [(host, i + 1) for i, c in enumerate(host) if c == '.']
+    return {text[start:start + n] for text, start in starts for n in range(1, MAX_GRAM + 1) if start + n <= len(text)}
+
+
+class SearchIndex:
+    """
+    Substring index over the website and username of a user's entries.
+
+    Each field is broken into 1- to 3-character grams with a posting set
+    of entry ids per gram, plus postings for grams at the start of a field
+    or hostname label and for whole field values. Entries are also kept
+    presorted by website and username, so a page of results is read off
+    that order and the scan stops once the page is full. Passwords are
+    never read.
+
+    Safe to share between threads: reads and writes take the index's own
+    lock, so it can be built, and kept in step with a reloaded vault,
+    without holding the caller's write lock.
+    """
+
+    def __init__(self, rows: Iterable[dict] = ()):
+        self.rows: Dict[int, dict] = {}
+        self.keys: Dict[int, Key] = {}
+        self.order: List[Key] = []
+        self.postings: Dict[str, Set[int]] = {}
+        self.prefixes: Dict[str, Set[int]] = {}
+        self.exact: Dict[str, Set[int]] = {}
+        self.lock = threading.Lock()
+        for row in rows:
+            self._add(row, sort=False)
+        self.order.sort()
+
+    @staticmethod
+    def _key(row: dict) -> Key:
+        return row['website_url'].lower(), row['username'].lower(), row['id']
+
+    def _index(self, key: Key, postings: Dict[str, Set[int]], grams: Iterable[str]) -> None:
+        for gram in grams:
+            posting = postings.get(gram)
+            if posting is None:
+                postings[gram] = {key[2]}
+            else:
+                posting.add(key[2])
+
+    def _unindex(self, key: Key, postings: Dict[str, Set[int]], grams: Iterable[str]) -> None:
+        for gram in grams:
+            posting = postings.get(gram)
+            if posting is not None:
+                posting.discard(key[2])
+                if not posting:
+                    del postings[gram]
+
+    def _add(self, row: dict, sort: bool = True) -> None:
+        key = self._key(row)
+        old = self.keys.get(key[2])
+        self.rows[key[2]] = row
+        if old == key:
+            return
+        if old is not None:
+            self._remove(key[2])
+            self.rows[key[2]] = row
+        host, username, _ = key
+        self.keys[key[2]] = key
+        self._index(key, self.postings, _all_grams(host) | _all_grams(username))
+        self._index(key, self.prefixes, _prefix_grams(host, username))
+        self._index(key, self.exact, {host, username})
+        if sort:
+            bisect.insort(self.order, key)
+        else:
+            self.order.append(key)
+
+    def _remove(self, row_id: int) -> None:
+        key = self.keys.pop(row_id, None)
+        self.rows.pop(row_id, None)
+        if key is None:
+            return
+        host, username, _ = key
+        self._unindex(key, self.postings, _all_grams(host) | _all_grams(username))
+        self._unindex(key, self.prefixes, _prefix_grams(host, username))
+        self._unindex(key, self.exact, {host, username})
+        position = bisect.bisect_left(self.order, key)
+        if position < len(self.order) and self.order[position] == key:
+            del self.order[position]
+
+    def add(self, row: dict) -> None:
+        with self.lock:
+            self._add(row)
+
+    def remove(self, row_id: int) -> None:
+        with self.lock:
+            self._remove(row_id)
+
+    def sync(self, rows: Iterable[dict]) -> None:
+        """
+        Make the index hold exactly rows, re-indexing only entries that
+        were added, removed or renamed since it was built.
+        """
+        rows = {row['id']: row for row in rows}
+        with self.lock:
+            for row_id in [row_id for row_id in self.keys if row_id not in rows]:
+                self._remove(row_id)
+            for row in rows.values():
+                self._add(row)
+
+    def _candidates(self, query: str) -> Set[int]:
+        grams = _grams(query, min(len(query), MAX_GRAM))
+        postings = [self.postings.get(gram) for gram in grams]
+        if not all(postings):
+            return set()
+        postings.sort(key=len)
+        return postings[0].intersection(*postings[1:])
+
+    def _sorted_page(self, ids: Set[int], count: int) -> List[Key]:
+        # First count keys of ids in (website, username) order. Large sets
+        # are read off the presorted order, stopping once count are found
+        if count <= 0:
+            return []
+        if len(ids) * 8 < len(self.order):
+            return heapq.nsmallest(count, (self.keys[row_id] for row_id in ids))
+        page = []
+        for key in self.order:
+            if key[2] in ids:
+                page.append(key)
+                if len(page) == count:
+                    break
+        return page
+
+    def _ranked(self, query: str) -> Tuple[int, List[Callable[[], Set[int]]]]:
+        """
+        Return the number of matches and, in rank order, functions giving
+        the ids of exact, prefix and other substring matches. Later ranks
+        are only computed if the page reaches them.
+        """
+        exact = self.exact.get(query, set())
+        if len(query) <= MAX_GRAM:
+            # Postings are exact for queries up to MAX_GRAM characters
+            matches = self.postings.get(query, set())
+            prefix = self.prefixes.get(query, set())
+            return len(matches), [
+                lambda: exact,
+                lambda: prefix - exact,
+                lambda: matches - prefix - exact
+            ]
+
+        # Longer queries can match grams scattered across the field, so the
+        # candidates are checked; they are few by then
+        ranks: Tuple[Set[int], Set[int], Set[int]] = (set(), set(), set())
+        for row_id in self._candidates(query):
+            host, username, _ = self.keys[row_id]
+            if query not in host and query not in username:
+                continue
+            if row_id in exact:
+                ranks[0].add(row_id)
+            elif host.startswith(query) or username.startswith(query) or ('.' + query) in host:
+                ranks[1].add(row_id)
+            else:
+                ranks[2].add(row_id)
+        return sum(map(len, ranks)), [lambda ids=ids: ids for ids in ranks]
+
+    def search(self, query: str, offset: int = 0, limit: int = 20) -> Tuple[int, List[dict]]:
+        """
+        Return (total, page) for entries whose website or username contains
+        query. Exact matches rank first, then prefix matches (including the
+        start of any hostname label), then other substring matches; ties
+        are ordered by website and username. An empty query pages through
+        every entry.
+        """
+        query = query.strip().lower()
+        with self.lock:
+            if not query:
+                page = self.order[offset:offset + limit]
+                return len(self.order), [self.rows[key[2]] for key in page]
+
+            total, ranks = self._ranked(query)
+            page: List[Key] = []
+            skip = offset
+            for rank in ranks:
+                if len(page) >= limit:
+                    break
+                ids = rank()
+                if len(ids) <= skip:
+                    skip -= len(ids)
+                    continue
+                page.extend(self._sorted_page(ids, skip + limit - len(page))[skip:])
+                skip = 0
+            return total, [self.rows[key[2]] for key in page]
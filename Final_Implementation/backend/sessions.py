@@ -0,0 +1,118 @@
+import secrets
+import threading
+import time
+from typing import Dict, Optional, Set, Tuple
+
+from itsdangerous import BadSignature, URLSafeSerializer
+
+
+class SessionStore:
+    """
+    In-process session table.
+
+    Clients hold a signed token wrapping a random session id; the id maps to
+    (email, expiry) in memory, so resolving a session is one dict lookup.
+    Sessions expire after `ttl` seconds of inactivity.
+    """
+
+    def __init__(self, secret_key: str, ttl: float, purge_every: int = 256):
+        self.serializer = URLSafeSerializer(secret_key, salt='session')
+        self.ttl = ttl
+        self.purge_every = purge_every
+        self.sessions: Dict[str, Tuple[str, float]] = {}
+        self.by_user: Dict[str, Set[str]] = {}
+        self.lock = threading.Lock()
+        self._creates = 0
+
+    def create(self, email: str) -> str:
+        """
+        Start a session for a user and return its signed token.
+        """
+        sid = secrets.token_urlsafe(32)
+        with self.lock:
+            self.sessions[sid] = (email, time.monotonic() + self.ttl)
+            self.by_user.setdefault(email, set()).add(sid)
+            self._creates += 1
+            if self._creates % self.purge_every == 0:
+                self._purge_expired()
+        return self.serializer.dumps(sid)
+
+    def _unsign(self, token: Optional[str]) -> Optional[str]:
+        if not token:
+            return None
+        try:
+            return self.serializer.loads(token)
+        except BadSignature:
+            return None
+
+    def resolve(self, token: Optional[str]) -> Optional[str]:
+        """
+        Return the email for a token, or None if it is invalid or expired.
+        Successful lookups extend the session.
+        """
+        return self._lookup(token, extend=True)
+
+    def peek(self, token: Optional[str]) -> Optional[str]:
+        """
+        Like resolve(), but without extending the session, for checks that
+        are not user activity (e.g. an open event stream).
+        """
+        return self._lookup(token, extend=False)
+
+    def _lookup(self, token: Optional[str], extend: bool) -> Optional[str]:
+        sid = self._unsign(token)
+        if sid is None:
+            return None
+        entry = self.sessions.get(sid)
+        if entry is None:
+            return None
+        email, expires_at = entry
+        now = time.monotonic()
+        if expires_at > now and not extend:
+            return email
+        with self.lock:
+            if sid not in self.sessions:
+                return None
+            if expires_at <= now:
+                self._remove(sid)
+                return None
+            self.sessions[sid] = (email, now + self.ttl)
+        return email
+
+    def revoke(self, token: Optional[str]) -> Optional[str]:
+        """
+        End the session for a token. Returns the email it belonged to.
+        """
+        sid = self._unsign(token)
+        if sid is None:
+            return None
+        with self.lock:
+            return self._remove(sid)
+
+    def revoke_user(self, email: str) -> None:
+        """
+        End every session belonging to a user.
+        """
+        with self.lock:
+            for sid in list(self.by_user.get(email, ())):
+                self._remove(sid)
+
+    def active_count(self) -> int:
+        return len(self.sessions)
+
+    def _remove(self, sid: str) -> Optional[str]:
+        entry = self.sessions.pop(sid, None)
+        if entry is None:
+            return None
+        email = entry[0]
+        sids = self.by_user.get(email)
+        if sids is not None:
+            sids.discard(sid)
+            if not sids:
+                del self.by_user[email]
+        return email
+
+    def _purge_expired(self) -> None:
+        now = time.monotonic()
+        for sid in [sid for sid, (_, expires_at) in self.sessions.items() if expires_at <= now]:
+            self._remove(sid)
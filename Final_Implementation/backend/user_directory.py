@@ -0,0 +1,184 @@
+import csv
+import logging
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+Signature = Optional[Tuple[int, int, int]]
+
+log = logging.getLogger('pm.users')
+
+
+def normalize_name(name: str) -> str:
+    return name.strip().casefold()
+
+
+class UserDirectory:
+    """
+    Hash map of the accounts in a CSV file, keyed by normalised username.
+
+    The file is loaded on first use and reloaded whenever its (mtime,
+    size, inode) signature changes, e.g. because another process wrote
+    to it. A lookup costs one os.stat plus one dict lookup, however many
+    accounts there are. Writes made through the directory go to the file
+    and the map together under one lock, so they need no reload.
+
+    Names are matched exactly first and case-insensitively second, so
+    accounts from older files whose names differ only by case each keep
+    resolving to their own row; such collisions are logged on load and
+    new ones are refused by add().
+    """
+
+    def __init__(self, path: str, key_column: str, fieldnames: List[str],
+                 include: Callable[[dict], bool] = lambda row: True):
+        self.path = path
+        self.key_column = key_column
+        self.fieldnames = fieldnames
+        self.include = include
+        self.lock = threading.RLock()
+        self.entries: Dict[str, dict] = {}
+        # Stripped but case-preserved name -> row
+        self.exact: Dict[str, dict] = {}
+        self.collisions = 0
+        self.file_fieldnames: Optional[List[str]] = None
+        self.signature: Signature = None
+        self.loaded = False
+        self.reloads = 0
+
+    def _stat(self) -> Signature:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def _load(self, signature: Signature) -> None:
+        entries: Dict[str, dict] = {}
+        exact: Dict[str, dict] = {}
+        collisions = set()
+        file_fieldnames = None
+        if signature is not None:
+            with open(self.path, mode='r', newline='') as file:
+                reader = csv.DictReader(file)
+                for row in reader:
+                    if row.get(self.key_column) and self.include(row):
+                        name = row[self.key_column].strip()
+                        # The first row for a name wins, as with the old linear scans
+                        exact.setdefault(name, row)
+                        first = entries.setdefault(normalize_name(name), row)
+                        if first is not row and first[self.key_column].strip() != name:
+                            collisions.add((first[self.key_column].strip(), name))
+                file_fieldnames = reader.fieldnames
+        if collisions:
+            log.warning(
+                '%d accounts in %s differ from an earlier one only by case; they can '
+                'only log in by their exact name: %s', len(collisions), self.path,
+                ', '.join(f'{b!r} (after {a!r})' for a, b in sorted(collisions))
+            )
+        # Swapped in whole, so lookups never see a half-built map
+        self.entries = entries
+        self.exact = exact
+        self.collisions = len(collisions)
+        self.file_fieldnames = file_fieldnames
+        self.signature = signature
+        self.loaded = True
+        self.reloads += 1
+
+    def _refresh(self) -> None:
+        signature = self._stat()
+        if self.loaded and signature == self.signature:
+            return
+        with self.lock:
+            signature = self._stat()
+            if not self.loaded or signature != self.signature:
+                self._load(signature)
+
+    def get(self, name: str) -> Optional[dict]:
+        """
+        Get the row for an account, or None. An exact match wins over one
+        that differs only by case.
+        """
+        self._refresh()
+        exact = self.exact.get(name.strip())
+        if exact is not None:
+            return exact
+        return self.entries.get(normalize_name(name))
+
+    def __contains__(self, name: str) -> bool:
+        return self.get(name) is not None
+
+    def append(self, row: dict) -> None:
+        """
+        Append a row to the file, writing the header if the file is new,
+        and index it if it is an account.
+        """
+        with self.lock:
+            self._refresh()
+            with open(self.path, mode='a', newline='') as file:
+                start = file.tell()
+                fieldnames = self.file_fieldnames if start else self.fieldnames
+                writer = csv.DictWriter(file, fieldnames=fieldnames, extrasaction='ignore')
+                if not start:
+                    writer.writeheader()
+                writer.writerow(row)
+                end = file.tell()
+            self.file_fieldnames = fieldnames
+
+            key = row.get(self.key_column)
+            if key and self.include(row):
+                # Stored the way the file will read back
+                stored = {name: '' if row.get(name) is None else str(row[name]) for name in fieldnames}
+                self.exact.setdefault(stored[self.key_column].strip(), stored)
+                self.entries.setdefault(normalize_name(key), stored)
+            # Skip the reload only if the file holds exactly what we loaded
+            # plus this row; anything else another process wrote is picked up
+            # on the next lookup
+            loaded_size = self.signature[1] if self.signature else 0
+            signature = self._stat()
+            if start == loaded_size and signature is not None and signature[1] == end:
+                self.signature = signature
+
+    def add(self, name: str, row: dict) -> bool:
+        """
+        Append an account unless the name is taken. Returns False if it
+        was; the check and the write are atomic within this process.
+        """
+        with self.lock:
+            if self.get(name) is not None:
+                return False
+            self.append(row)
+            return True
+
+    def update(self, name: str, changes: dict) -> bool:
+        """
+        Change fields of the account get(name) resolves to, and of no
+        other row. The file is rewritten to a temporary file and swapped in
+        atomically. Returns False if there is no such account.
+        """
+        with self.lock:
+            target = self.get(name)
+            if target is None:
+                return False
+            key = target[self.key_column].strip()
+            with open(self.path, mode='r', newline='') as file:
+                reader = csv.DictReader(file)
+                fieldnames = reader.fieldnames
+                rows = list(reader)
+
+            # The first account row with exactly this name, as get() picks it
+            for row in rows:
+                if row.get(self.key_column) and row[self.key_column].strip() == key and self.include(row):
+                    row.update(changes)
+                    break
+
+            tmp_file = self.path + '.tmp'
+            with open(tmp_file, mode='w', newline='') as file:
+                writer = csv.DictWriter(file, fieldnames=fieldnames)
+                writer.writeheader()
+                writer.writerows(rows)
+            os.replace(tmp_file, self.path)
+            self._load(self._stat())
+            return True
+
+    def stats(self) -> Dict[str, int]:
+        return {'users': len(self.exact), 'reloads': self.reloads, 'case_collisions': self.collisions}
@@ -1,18 +1,67 @@
-import sqlite3
-from typing import List, Dict, Any
-from cryptography.fernet import Fernet
+from db_pool import get_connection
+from hashing_pool import run_hash
+from metrics import stage
+from parallel_crypto import DEFAULT_CHUNK_SIZE, Cipher, decrypt_many, get_shared_executor, make_cipher
+from typing import List, Dict, Any, Iterator, NamedTuple, Optional, Tuple
+from concurrent.futures import Executor
+from collections import OrderedDict
+import hashlib
+import logging
 import os
-from base64 import b64encode, b64decode
+import threading
+import time
+from base64 import b64encode, b64decode, urlsafe_b64encode
+
+CIPHER_CACHE_SIZE = int(os.getenv('CIPHER_CACHE_SIZE', '1024'))
+# Derived keys are dropped after this long even while the user stays active
+KEY_CACHE_TTL_SECONDS = float(os.getenv('KEY_CACHE_TTL_SECONDS', '3600'))
+# scrypt cost for new user keys. Each user's salt is stored with the cost it
+# was derived with, so changing these only affects new users until
+# rekey_vault.py re-encrypts the existing ones
+KDF_N = int(os.getenv('VAULT_KDF_N', str(2 ** 15)))
+KDF_R = int(os.getenv('VAULT_KDF_R', '8'))
+KDF_P = int(os.getenv('VAULT_KDF_P', '1'))
+# Also accept entries encrypted with the old id + MASTER_KEY key; turn off
+# once rekey_vault.py has re-encrypted every vault
+LEGACY_KEY_FALLBACK = os.getenv('LEGACY_KEY_FALLBACK', '1') == '1'
+# Below this many rows get_credentials decrypts serially; pool overhead
+# outweighs the gain for small vaults
+PARALLEL_DECRYPT_THRESHOLD = int(os.getenv('PARALLEL_DECRYPT_THRESHOLD', '512'))
+# Rows read per query when streaming a whole vault
+STREAM_BATCH_SIZE = int(os.getenv('STREAM_BATCH_SIZE', '256'))
+# Versions of change history kept per user for /sync; older clients get a snapshot
+CHANGE_LOG_RETENTION = int(os.getenv('CHANGE_LOG_RETENTION', '1000'))
+
+log = logging.getLogger('pm.vault')
+
+class CachedKey(NamedTuple):
+    keys: Tuple[bytes, ...]  # encryption key first, then keys only used to decrypt
+    cipher: Cipher
+    expires: float
+
+# LRU of user_id -> derived key, so the KDF runs once per session rather
+# than once per request
+_cipher_cache: 'OrderedDict[int, CachedKey]' = OrderedDict()
+_cipher_cache_lock = threading.Lock()
+_cipher_cache_stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expired': 0}
+# Striped so concurrent first requests for one user derive its key once,
+# without serialising derivations for different users
+_derive_locks = [threading.Lock() for _ in range(64)]
 
 def get_db_connection():
-    conn = sqlite3.connect('password_manager.db')
-    conn.row_factory = sqlite3.Row
-    return conn
+    # Pooled connection; close() hands it back to the pool
+    return get_connection()
 
 def init_vault():
     conn = get_db_connection()
     c = conn.cursor()
     
+    # Incremental auto-vacuum lets the compactor give free pages back after
+    # deletes; switching an existing database over needs one full VACUUM
+    if c.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+        c.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        c.execute('VACUUM')
+    
     # Create credentials table
     c.execute('''
         CREATE TABLE IF NOT EXISTS credentials (
@@ -26,33 +75,226 @@ def init_vault():
         )
     ''')
     
+    # Older databases may hold duplicates, usually because a changed
+    # password was saved again. Before the unique index below exists, keep
+    # the newest copy and move the rest to credentials_duplicates
+    has_unique_index = c.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_credentials_user_website_username'"
+    ).fetchone()
+    if not has_unique_index:
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS credentials_duplicates AS
+            SELECT * FROM credentials WHERE 0
+        ''')
+        superseded = '''
+            id NOT IN (
+                SELECT MAX(id) FROM credentials GROUP BY user_id, website_url, username
+            )
+        '''
+        c.execute(f'INSERT INTO credentials_duplicates SELECT * FROM credentials WHERE {superseded}')
+        moved = c.execute(f'DELETE FROM credentials WHERE {superseded}').rowcount
+        if moved:
+            log.warning(
+                'Moved %d older duplicate credentials to credentials_duplicates; '
+                'the newest copy of each entry was kept', moved
+            )
+    
+    # One entry per (user, website, username); the index prefix also serves
+    # lookups by user_id and by (user_id, website_url)
+    c.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_credentials_user_website_username
+        ON credentials (user_id, website_url, username)
+    ''')
+    
+    # Per-user version, bumped on every change so caches can detect writes
+    # made by other processes
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS vault_versions (
+            user_id INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    
+    # Change log for delta sync: one row per write, tagged with the version
+    # it produced. Only the last CHANGE_LOG_RETENTION versions are kept.
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS credential_changes (
+            user_id INTEGER NOT NULL,
+            version INTEGER NOT NULL,
+            credential_id INTEGER NOT NULL,
+            op TEXT NOT NULL,
+            PRIMARY KEY (user_id, version)
+        ) WITHOUT ROWID
+    ''')
+    for event, row, op in (('INSERT', 'NEW', 'put'), ('UPDATE', 'NEW', 'put'), ('DELETE', 'OLD', 'delete')):
+        # Recreated on every start so older databases pick up the logging
+        c.execute(f'DROP TRIGGER IF EXISTS credentials_version_{event.lower()}')
+        c.execute(f'''
+            CREATE TRIGGER credentials_version_{event.lower()}
+            AFTER {event} ON credentials
+            BEGIN
+                INSERT INTO vault_versions (user_id, version) VALUES ({row}.user_id, 1)
+                ON CONFLICT (user_id) DO UPDATE SET version = version + 1;
+                INSERT INTO credential_changes (user_id, version, credential_id, op)
+                SELECT {row}.user_id, version, {row}.id, '{op}'
+                FROM vault_versions WHERE user_id = {row}.user_id;
+                DELETE FROM credential_changes
+                WHERE user_id = {row}.user_id AND version <= (
+                    SELECT version - {CHANGE_LOG_RETENTION} FROM vault_versions WHERE user_id = {row}.user_id
+                );
+            END
+        ''')
+    
+    # Per-user scrypt salt and the cost the user's key was derived with
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS vault_keys (
+            user_id INTEGER PRIMARY KEY,
+            salt BLOB NOT NULL,
+            n INTEGER NOT NULL,
+            r INTEGER NOT NULL,
+            p INTEGER NOT NULL
+        )
+    ''')
+    
     conn.commit()
     conn.close()
 
-def get_encryption_key(user_id: int) -> bytes:
+def get_legacy_key(user_id: int) -> bytes:
     """
-    Get or generate an encryption key for a user.
-    The key is derived from the user's ID and a master key.
+    The key used before scrypt derivation: the user's ID and a slice of
+    the master key. Only used to read entries saved with it.
     """
     master_key = os.getenv('MASTER_KEY', 'your-master-key').encode()
     user_key = str(user_id).encode()
-    return b64encode(user_key + master_key[:32 - len(user_key)])
+    # Fernet needs exactly 32 bytes; pad when MASTER_KEY is short
+    return b64encode((user_key + master_key)[:32].ljust(32, b'0'))
+
+def get_kdf_params(user_id: int, conn=None) -> Tuple[bytes, int, int, int]:
+    """
+    Get a user's (salt, n, r, p), creating a random salt with the
+    configured cost the first time.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_db_connection()
+    try:
+        c = conn.cursor()
+        c.execute(
+            'INSERT OR IGNORE INTO vault_keys (user_id, salt, n, r, p) VALUES (?, ?, ?, ?, ?)',
+            (user_id, os.urandom(16), KDF_N, KDF_R, KDF_P)
+        )
+        # Another process may have created the row first; use whichever won
+        row = c.execute('SELECT salt, n, r, p FROM vault_keys WHERE user_id = ?', (user_id,)).fetchone()
+        if own_conn:
+            conn.commit()
+        return bytes(row['salt']), row['n'], row['r'], row['p']
+    finally:
+        if own_conn:
+            conn.close()
+
+def _scrypt(password: bytes, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(password, salt=salt, n=n, r=r, p=p, maxmem=128 * r * (n + p + 2) + (1 << 20), dklen=32)
+
+def derive_key(salt: bytes, n: int, r: int, p: int) -> bytes:
+    """
+    Derive a Fernet key from the master key with scrypt. Deliberately
+    slow, and run on the hashing pool so concurrent logins cannot use
+    unbounded memory; use get_cipher()/get_encryption_key(), which cache it.
+    """
+    master_key = os.getenv('MASTER_KEY', 'your-master-key').encode()
+    return urlsafe_b64encode(run_hash(_scrypt, master_key, salt, n, r, p))
+
+def _cached_key(user_id: int) -> CachedKey:
+    with _cipher_cache_lock:
+        entry = _cipher_cache.get(user_id)
+        if entry is not None and entry.expires > time.monotonic():
+            _cipher_cache.move_to_end(user_id)
+            _cipher_cache_stats['hits'] += 1
+            return entry
+        if entry is not None:
+            del _cipher_cache[user_id]
+            _cipher_cache_stats['expired'] += 1
+        _cipher_cache_stats['misses'] += 1
+    
+    with _derive_locks[user_id % len(_derive_locks)]:
+        # Someone else may have derived it while we waited
+        with _cipher_cache_lock:
+            entry = _cipher_cache.get(user_id)
+            if entry is not None and entry.expires > time.monotonic():
+                return entry
+        
+        keys = (derive_key(*get_kdf_params(user_id)),)
+        if LEGACY_KEY_FALLBACK:
+            keys += (get_legacy_key(user_id),)
+        entry = CachedKey(keys, make_cipher(keys), time.monotonic() + KEY_CACHE_TTL_SECONDS)
+        
+        with _cipher_cache_lock:
+            _cipher_cache[user_id] = entry
+            _cipher_cache.move_to_end(user_id)
+            while len(_cipher_cache) > CIPHER_CACHE_SIZE:
+                _cipher_cache.popitem(last=False)
+                _cipher_cache_stats['evictions'] += 1
+    return entry
+
+def get_encryption_key(user_id: int) -> bytes:
+    """
+    Get the user's current encryption key, deriving it on the first use.
+    """
+    return _cached_key(user_id).keys[0]
+
+def get_decryption_keys(user_id: int) -> Tuple[bytes, ...]:
+    """
+    Get every key the user's entries may be encrypted with, current first.
+    """
+    return _cached_key(user_id).keys
+
+def get_cipher(user_id: int) -> Cipher:
+    """
+    Get the cipher for a user, deriving its key on the first use.
+    """
+    return _cached_key(user_id).cipher
+
+def warm_cipher(user_id: int) -> None:
+    """
+    Derive and cache a user's key ahead of their first vault request,
+    so the KDF cost is paid at login.
+    """
+    _cached_key(user_id)
+
+def evict_cipher(user_id: int) -> None:
+    """
+    Drop a user's cached key, e.g. on logout.
+    """
+    with _cipher_cache_lock:
+        _cipher_cache.pop(user_id, None)
 
+def clear_cipher_cache() -> None:
+    """
+    Drop every cached cipher. Call this after changing MASTER_KEY.
+    """
+    with _cipher_cache_lock:
+        _cipher_cache.clear()
+
+def cipher_cache_stats() -> Dict[str, int]:
+    """
+    Get hit/miss/eviction counters and the current size of the cipher cache.
+    """
+    with _cipher_cache_lock:
+        return dict(_cipher_cache_stats, size=len(_cipher_cache), max_size=CIPHER_CACHE_SIZE)
+
+@stage('encrypt')
 def encrypt_password(password: str, user_id: int) -> str:
     """
     Encrypt a password using the user's encryption key.
     """
-    key = get_encryption_key(user_id)
-    f = Fernet(key)
-    return f.encrypt(password.encode()).decode()
+    return get_cipher(user_id).encrypt(password.encode()).decode()
 
+@stage('decrypt')
 def decrypt_password(encrypted_password: str, user_id: int) -> str:
     """
     Decrypt a password using the user's encryption key.
     """
-    key = get_encryption_key(user_id)
-    f = Fernet(key)
-    return f.decrypt(encrypted_password.encode()).decode()
+    return get_cipher(user_id).decrypt(encrypted_password.encode()).decode()
 
 def get_user_id(username: str) -> int:
     """
@@ -70,6 +312,128 @@ def get_user_id(username: str) -> int:
     finally:
         conn.close()
 
+def get_or_create_user_id(username: str) -> int:
+    """
+    Get a user's ID, creating a users row for accounts managed outside
+    the database (the Flask app keeps its logins in user_data.csv).
+    """
+    conn = get_db_connection()
+    c = conn.cursor()
+    
+    try:
+        c.execute(
+            "INSERT OR IGNORE INTO users (username, password_hash) VALUES (?, '')",
+            (username,)
+        )
+        conn.commit()
+        c.execute('SELECT id FROM users WHERE username = ?', (username,))
+        return c.fetchone()['id']
+    finally:
+        conn.close()
+
+@stage('db_read')
+def get_vault_version(user_id: int) -> int:
+    """
+    Get the change counter for a user's credentials.
+    """
+    conn = get_db_connection()
+    c = conn.cursor()
+    
+    try:
+        c.execute('SELECT version FROM vault_versions WHERE user_id = ?', (user_id,))
+        result = c.fetchone()
+        return result['version'] if result else 0
+    finally:
+        conn.close()
+
+@stage('db_read')
+def fetch_encrypted_credentials(user_id: int) -> List[Dict[str, Any]]:
+    """
+    Get all credential rows for a user with passwords still encrypted.
+    """
+    conn = get_db_connection()
+    c = conn.cursor()
+    
+    try:
+        c.execute(
+            'SELECT id, website_url, username, encrypted_password FROM credentials WHERE user_id = ?',
+            (user_id,)
+        )
+        return [dict(cred) for cred in c.fetchall()]
+    finally:
+        conn.close()
+
+def insert_encrypted_credentials(user_id: int, website_url: str, username_cred: str, encrypted_password: str) -> Optional[int]:
+    """
+    Insert an already encrypted credential.
+    Returns the new row id, or None if the entry already exists.
+    """
+    return insert_encrypted_credentials_batch(user_id, [(website_url, username_cred, encrypted_password)])[0]
+
+@stage('db_write')
+def insert_encrypted_credentials_batch(user_id: int, entries: List[tuple]) -> List[Optional[int]]:
+    """
+    Insert several already encrypted (website_url, username, encrypted_password)
+    entries in one transaction.
+    Returns the new row id for each entry, or None where it already existed.
+    """
+    conn = get_db_connection()
+    c = conn.cursor()
+    
+    try:
+        row_ids = []
+        for website_url, username_cred, encrypted_password in entries:
+            c.execute(
+                '''
+                INSERT OR IGNORE INTO credentials (user_id, website_url, username, encrypted_password)
+                VALUES (?, ?, ?, ?)
+                ''',
+                (user_id, website_url, username_cred, encrypted_password)
+            )
+            row_ids.append(c.lastrowid if c.rowcount else None)
+        conn.commit()
+        return row_ids
+    finally:
+        conn.close()
+
+@stage('db_write')
+def update_encrypted_password(user_id: int, credential_id: int, encrypted_password: str) -> bool:
+    """
+    Replace the encrypted password of one of a user's credentials.
+    Returns False if the credential doesn't exist.
+    """
+    conn = get_db_connection()
+    c = conn.cursor()
+    
+    try:
+        c.execute(
+            'UPDATE credentials SET encrypted_password = ? WHERE id = ? AND user_id = ?',
+            (encrypted_password, credential_id, user_id)
+        )
+        conn.commit()
+        return c.rowcount > 0
+    finally:
+        conn.close()
+
+@stage('db_write')
+def delete_credential_row(user_id: int, credential_id: int) -> bool:
+    """
+    Delete one of a user's credentials by id.
+    Returns False if the credential doesn't exist.
+    """
+    conn = get_db_connection()
+    c = conn.cursor()
+    
+    try:
+        c.execute(
+            'DELETE FROM credentials WHERE id = ? AND user_id = ?',
+            (credential_id, user_id)
+        )
+        conn.commit()
+        return c.rowcount > 0
+    finally:
+        conn.close()
+
 def save_credentials(username: str, website_url: str, username_cred: str, password: str) -> None:
     """
     Save encrypted credentials for a user.
@@ -92,9 +456,15 @@ def save_credentials(username: str, website_url: str, username_cred: str, passwo
     finally:
         conn.close()
 
-def get_credentials(username: str) -> List[Dict[str, Any]]:
+def get_credentials(username: str, executor: Optional[Executor] = None,
+                    chunk_size: int = DEFAULT_CHUNK_SIZE,
+                    parallel_threshold: int = PARALLEL_DECRYPT_THRESHOLD) -> List[Dict[str, Any]]:
     """
     Get all credentials for a user, with decrypted passwords.
+    Vaults with at least parallel_threshold rows are decrypted in chunks of
+    chunk_size on a worker pool (the shared CRYPTO_WORKERS pool unless an
+    executor is given); smaller ones are decrypted serially. Row order is
+    preserved either way.
     """
     user_id = get_user_id(username)
     
@@ -107,13 +477,219 @@ def get_credentials(username: str) -> List[Dict[str, Any]]:
             (user_id,)
         )
         credentials = c.fetchall()
+    finally:
+        conn.close()
+    
+    passwords = _decrypt_tokens(
+        user_id,
+        [cred['encrypted_password'] for cred in credentials],
+        executor,
+        chunk_size,
+        parallel_threshold
+    )
+    
+    return [{
+        'id': cred['id'],
+        'websiteUrl': cred['website_url'],
+        'username': cred['username'],
+        'password': password
+    } for cred, password in zip(credentials, passwords)]
+
+@stage('db_read')
+def fetch_credentials_page(user_id: int, after_id: int = 0, limit: int = STREAM_BATCH_SIZE) -> List[Dict[str, Any]]:
+    """
+    Get up to limit encrypted rows with id greater than after_id, in id order.
+    Seeks on the primary key, so every page costs the same however deep it is.
+    """
+    conn = get_db_connection()
+    c = conn.cursor()
+    
+    try:
+        c.execute(
+            '''
+            SELECT id, website_url, username, encrypted_password FROM credentials
+            WHERE user_id = ? AND id > ?
+            ORDER BY id
+            LIMIT ?
+            ''',
+            (user_id, after_id, limit)
+        )
+        return [dict(cred) for cred in c.fetchall()]
+    finally:
+        conn.close()
+
+@stage('decrypt')
+def _decrypt_serial(user_id: int, tokens: List[str]) -> List[str]:
+    cipher = get_cipher(user_id)
+    return [cipher.decrypt(token.encode()).decode() for token in tokens]
+
+def _decrypt_tokens(user_id: int, tokens: List[str], executor: Optional[Executor] = None,
+                    chunk_size: int = DEFAULT_CHUNK_SIZE,
+                    parallel_threshold: int = PARALLEL_DECRYPT_THRESHOLD) -> List[str]:
+    """
+    Decrypt a user's tokens in order. At least parallel_threshold of them
+    are decrypted in chunks of chunk_size on a worker pool (the shared
+    CRYPTO_WORKERS pool unless an executor is given), fewer serially.
+    """
+    if len(tokens) >= parallel_threshold:
+        executor = executor or get_shared_executor()
+        if executor is not None:
+            return decrypt_many(get_decryption_keys(user_id), tokens, executor, chunk_size)
+    return _decrypt_serial(user_id, tokens)
+
+def _decrypted(user_id: int, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    passwords = _decrypt_tokens(user_id, [cred['encrypted_password'] for cred in rows])
+    return [{
+        'id': cred['id'],
+        'websiteUrl': cred['website_url'],
+        'username': cred['username'],
+        'password': password
+    } for cred, password in zip(rows, passwords)]
+
+def get_credentials_page(user_id: int, after_id: int = 0, limit: int = 100) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """
+    Get one page of a user's credentials with decrypted passwords. Pages of
+    at least PARALLEL_DECRYPT_THRESHOLD rows are decrypted on the shared pool.
+    Returns the page and the cursor for the next one (None on the last page).
+    """
+    rows = fetch_credentials_page(user_id, after_id, limit + 1)
+    next_cursor = rows[limit - 1]['id'] if len(rows) > limit else None
+    return _decrypted(user_id, rows[:limit]), next_cursor
+
+def iter_credentials(user_id: int, after_id: int = 0, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    Yield all of a user's credentials after after_id with decrypted passwords.
+    Rows are read batch_size at a time, each batch on its own short-lived
+    connection, so memory stays flat and no read transaction is held open
+    while a slow client consumes the stream. With a worker pool, batches
+    are at least PARALLEL_DECRYPT_THRESHOLD rows so each is decrypted on it.
+    """
+    if get_shared_executor() is not None:
+        batch_size = max(batch_size, PARALLEL_DECRYPT_THRESHOLD)
+    while True:
+        rows = fetch_credentials_page(user_id, after_id, batch_size)
+        if not rows:
+            return
+        yield from _decrypted(user_id, rows)
+        if len(rows) < batch_size:
+            return
+        after_id = rows[-1]['id']
+
+@stage('db_read')
+def get_changes_since(user_id: int, since: int) -> Dict[str, Any]:
+    """
+    Describe how a user's vault changed after version since.
+
+    Returns {'version', 'full': False, 'changes'} where changes holds the
+    latest operation per entry ('put' with the entry's metadata, or
+    'delete'), or {'version', 'full': True, 'credentials'} with every
+    entry when since is older than the retained log or not a version this
+    vault has had. Passwords are not included.
+    """
+    conn = get_db_connection()
+    c = conn.cursor()
+    
+    try:
+        # One read transaction, so the version matches the rows returned
+        c.execute('BEGIN')
+        c.execute('SELECT version FROM vault_versions WHERE user_id = ?', (user_id,))
+        result = c.fetchone()
+        version = result['version'] if result else 0
         
+        c.execute('SELECT MIN(version) AS oldest FROM credential_changes WHERE user_id = ?', (user_id,))
+        oldest = c.fetchone()['oldest']
+        if since > version or (since < version and (oldest is None or since < oldest - 1)):
+            c.execute(
+                'SELECT id, website_url, username FROM credentials WHERE user_id = ? ORDER BY id',
+                (user_id,)
+            )
+            return {
+                'version': version,
+                'full': True,
+                'credentials': [{
+                    'id': cred['id'],
+                    'websiteUrl': cred['website_url'],
+                    'username': cred['username']
+                } for cred in c.fetchall()]
+            }
+        
+        c.execute(
+            '''
+            SELECT ch.credential_id, ch.op, cr.website_url, cr.username
+            FROM (
+                -- With MAX(), SQLite takes op from the row holding the latest version
+                SELECT credential_id, op, MAX(version) AS version FROM credential_changes
+                WHERE user_id = ? AND version > ?
+                GROUP BY credential_id
+            ) ch
+            LEFT JOIN credentials cr ON cr.id = ch.credential_id
+            ORDER BY ch.version
+            ''',
+            (user_id, since)
+        )
+        changes = []
+        for change in c.fetchall():
+            if change['op'] == 'delete' or change['website_url'] is None:
+                changes.append({'op': 'delete', 'id': change['credential_id']})
+            else:
+                changes.append({
+                    'op': 'put',
+                    'id': change['credential_id'],
+                    'websiteUrl': change['website_url'],
+                    'username': change['username']
+                })
+        return {'version': version, 'full': False, 'changes': changes}
+    finally:
+        conn.rollback()
+        conn.close()
+
+def list_credentials(username: str) -> List[Dict[str, Any]]:
+    """
+    List a user's credentials without decrypting any passwords.
+    """
+    user_id = get_user_id(username)
+    
+    conn = get_db_connection()
+    c = conn.cursor()
+    
+    try:
+        c.execute(
+            'SELECT id, website_url, username FROM credentials WHERE user_id = ?',
+            (user_id,)
+        )
         return [{
+            'id': cred['id'],
+            'websiteUrl': cred['website_url'],
+            'username': cred['username']
+        } for cred in c.fetchall()]
+    finally:
+        conn.close()
+
+def reveal_credential(username: str, credential_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Get a single credential for a user with its password decrypted.
+    Returns None if the credential doesn't exist.
+    """
+    user_id = get_user_id(username)
+    
+    conn = get_db_connection()
+    c = conn.cursor()
+    
+    try:
+        c.execute(
+            'SELECT * FROM credentials WHERE id = ? AND user_id = ?',
+            (credential_id, user_id)
+        )
+        cred = c.fetchone()
+        if cred is None:
+            return None
+        
+        return {
             'id': cred['id'],
             'websiteUrl': cred['website_url'],
             'username': cred['username'],
             'password': decrypt_password(cred['encrypted_password'], user_id)
-        } for cred in credentials]
+        }
     finally:
         conn.close()
 
@@ -0,0 +1,209 @@
+"""
+Benchmark the storage, crypto and auth hot paths across vault sizes.
+
+Builds synthetic vaults (see datagen.py) in a temporary directory and
+times the Flask routes, the vault.py and credential_store functions,
+auth.verify_user and the week04-06 AES helpers. Writes one JSON document
+with run metadata and per-benchmark timings; compare two of them with
+compare.py to catch regressions between commits.
+
+    python benchmarks/bench_hot_paths.py --sizes 10 100 1000 10000 100000 -o before.json
+"""
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.abspath(os.path.join(BENCH_DIR, '..', 'backend'))
+WEEK04_ENCRYPTION = os.path.abspath(os.path.join(BENCH_DIR, '..', '..', 'week04-week06', 'app', 'encryption.py'))
+
+
+def setup_environment(tmp_dir, bcrypt_rounds):
+    os.environ['DB_PATH'] = os.path.join(tmp_dir, 'bench.db')
+    # A fixed cost keeps verify_user comparable across machines and skips calibration
+    os.environ['BCRYPT_ROUNDS'] = str(bcrypt_rounds)
+    # Request logging would be timed too; keep only warnings
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.chdir(tmp_dir)
+    sys.path.insert(0, BACKEND_DIR)
+    sys.path.insert(0, BENCH_DIR)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=BENCH_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure(fn, min_time, min_iterations=3, max_iterations=1000):
+    """
+    Call fn(i) until min_time has passed (and at least min_iterations
+    calls were made) and summarise the per-call times in seconds.
+    """
+    times = []
+    started = time.perf_counter()
+    while len(times) < max_iterations and (
+        len(times) < min_iterations or time.perf_counter() - started < min_time
+    ):
+        call_started = time.perf_counter()
+        fn(len(times))
+        times.append(time.perf_counter() - call_started)
+    ordered = sorted(times)
+    return {
+        'iterations': len(times),
+        'min': ordered[0],
+        'median': statistics.median(ordered),
+        'p95': ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))],
+        'mean': statistics.fmean(ordered)
+    }
+
+
+class Runner:
+    def __init__(self, min_time):
+        self.min_time = min_time
+        self.results = []
+
+    def run(self, name, size, fn, **kwargs):
+        # Keep any stray output out of the JSON on stdout
+        with contextlib.redirect_stdout(io.StringIO()):
+            stats = measure(fn, self.min_time, **kwargs)
+        self.results.append({'name': name, 'size': size, **stats})
+        print(f"{name:<40} {str(size):>8} {stats['median'] * 1000:10.3f} ms  ({stats['iterations']} runs)",
+              file=sys.stderr)
+
+    def skip(self, name, reason):
+        self.results.append({'name': name, 'size': None, 'skipped': reason})
+        print(f'{name:<40} skipped: {reason}', file=sys.stderr)
+
+
+def bench_vault_size(runner, flask_app, size, users):
+    import credential_store
+    import vault
+    from datagen import populate_vaults
+
+    email = populate_vaults(users, size, seed=size, prefix=f's{size}-')[0]
+    user_id = vault.get_or_create_user_id(email)
+    rows = vault.fetch_encrypted_credentials(user_id)
+    sample = rows[len(rows) // 2]
+    version = vault.get_vault_version(user_id)
+
+    client = flask_app.test_client()
+    headers = {'Authorization': f"Bearer {flask_app.extensions['sessions'].create(email)}"}
+
+    runner.run('app./get_credentials', size, lambda i: client.post(
+        '/get_credentials', json={'websiteUrl': sample['website_url']}, headers=headers
+    ))
+    runner.run('app./save_credentials', size, lambda i: client.post(
+        '/save_credentials',
+        json={'websiteUrl': f'new{i}.bench.example.com', 'username': 'u', 'password': 'p'},
+        headers=headers
+    ))
+    runner.run('credential_store.find_credentials', size, lambda i: credential_store.find_credentials(
+        email, sample['website_url']
+    ))
+    runner.run('vault.get_credentials', size, lambda i: vault.get_credentials(email), max_iterations=20)
+    runner.run('vault.list_credentials', size, lambda i: vault.list_credentials(email), max_iterations=50)
+    runner.run('vault.reveal_credential', size, lambda i: vault.reveal_credential(email, sample['id']))
+    runner.run('vault.get_credentials_page', size, lambda i: vault.get_credentials_page(
+        user_id, sample['id'], 100
+    ))
+    runner.run('vault.get_changes_since', size, lambda i: vault.get_changes_since(
+        user_id, max(version - 10, 0)
+    ))
+    runner.run('vault.insert_encrypted_credentials', size, lambda i: vault.insert_encrypted_credentials(
+        user_id, f'insert{i}.bench.example.com', 'u', sample['encrypted_password']
+    ))
+
+
+def bench_auth(runner, csv_users):
+    import bcrypt
+
+    import app as flask_backend
+    import auth
+    from datagen import user_email, user_password, write_user_data, write_users_csv
+
+    # Worst case for the linear scans: the last account in the file
+    email, password = user_email(csv_users - 1), user_password(csv_users - 1)
+
+    write_user_data(flask_backend.USER_DATA_FILE, csv_users)
+    runner.run('app.verify_credentials', csv_users, lambda i: flask_backend.verify_credentials(email, password))
+
+    rounds = int(os.environ['BCRYPT_ROUNDS'])
+    write_users_csv('users.csv', csv_users, bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds)))
+    runner.run('auth.verify_user', csv_users, lambda i: auth.verify_user(email, password), max_iterations=20)
+
+
+def bench_week04_encryption(runner):
+    try:
+        spec = importlib.util.spec_from_file_location('week04_encryption', WEEK04_ENCRYPTION)
+        encryption = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(encryption)
+    except ImportError as e:
+        runner.skip('week04.encryption', f'{e} (pip install pycryptodome)')
+        return
+
+    secret = 'correct horse battery staple ' * 2
+    token = encryption.encrypt(secret)
+    runner.run('week04.encryption.encrypt', None, lambda i: encryption.encrypt(secret))
+    runner.run('week04.encryption.decrypt', None, lambda i: encryption.decrypt(token))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 10000, 100000],
+                        help='credentials per vault')
+    parser.add_argument('--users', type=int, default=2, help='users created per vault size')
+    parser.add_argument('--csv-users', type=int, default=1000, help='accounts in the login CSV files')
+    parser.add_argument('--bcrypt-rounds', type=int, default=10)
+    parser.add_argument('--min-time', type=float, default=0.5, help='seconds spent on each benchmark')
+    parser.add_argument('-o', '--output', default='-', help='results file, or - for stdout')
+    args = parser.parse_args()
+
+    started = datetime.now(timezone.utc)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        setup_environment(tmp_dir, args.bcrypt_rounds)
+        with contextlib.redirect_stdout(io.StringIO()):
+            import app
+            flask_app = app.create_app()
+            app.init_storage()
+
+        runner = Runner(args.min_time)
+        bench_auth(runner, args.csv_users)
+        bench_week04_encryption(runner)
+        for size in args.sizes:
+            bench_vault_size(runner, flask_app, size, args.users)
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'started': started.isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'args': vars(args)
+        },
+        'results': runner.results
+    }
+    if args.output == '-':
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark serial vs pooled decryption in vault.get_credentials.
+
+Builds throwaway vaults of increasing size in a temporary database and
+times a full listing with the serial path and with process/thread pools.
+Prints one JSON object per measurement.
+
+    python benchmarks/bench_parallel_decrypt.py --sizes 100 1000 10000 --workers 2 4
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+
+
+def setup_environment(tmp_dir):
+    os.environ['DB_PATH'] = os.path.join(tmp_dir, 'bench.db')
+    os.chdir(tmp_dir)
+    sys.path.insert(0, os.path.abspath(BACKEND_DIR))
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 500, 1000, 5000, 20000])
+    parser.add_argument('--workers', type=int, nargs='+', default=[2, 4])
+    parser.add_argument('--chunk-size', type=int, default=256)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        setup_environment(tmp_dir)
+        import auth
+        import vault
+        from parallel_crypto import create_executor, encrypt_many
+
+        auth.init_db()
+        vault.init_vault()
+        pools = {
+            (kind, workers): create_executor(workers, kind)
+            for kind in ('process', 'thread')
+            for workers in args.workers
+        }
+        try:
+            for size in args.sizes:
+                username = f'bench{size}@example.com'
+                user_id = vault.get_or_create_user_id(username)
+                passwords = [f'password-{i}' for i in range(size)]
+                encrypted = encrypt_many(vault.get_encryption_key(user_id), passwords)
+                vault.insert_encrypted_credentials_batch(user_id, [
+                    (f'site{i}.example.com', f'user{i}', token) for i, token in enumerate(encrypted)
+                ])
+
+                serial = best_of(
+                    lambda: vault.get_credentials(username, parallel_threshold=sys.maxsize), args.repeat
+                )
+                print(json.dumps({'size': size, 'mode': 'serial', 'workers': 1, 'seconds': round(serial, 6)}))
+                for (kind, workers), pool in pools.items():
+                    elapsed = best_of(
+                        lambda: vault.get_credentials(
+                            username, executor=pool, chunk_size=args.chunk_size, parallel_threshold=0
+                        ),
+                        args.repeat
+                    )
+                    print(json.dumps({
+                        'size': size,
+                        'mode': kind,
+                        'workers': workers,
+                        'seconds': round(elapsed, 6),
+                        'speedup': round(serial / elapsed, 2)
+                    }))
+        finally:
+            for pool in pools.values():
+                if pool is not None:
+                    pool.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Benchmark cold start: import time and first-request latency of the backend.
+
+Every sample is a fresh interpreter in a scratch directory, so nothing is
+cached in-process. Measures importing app.py (plus auth.py and vault.py on
+their own, as the CLI tools do), building the Flask app, the first and
+second request, and first_response: the total from the start of the
+import to the end of the first request. Each runs once against an empty
+data directory and once against an already initialised one. Output has
+the same shape as bench_hot_paths.py, so compare.py works on it.
+
+    python benchmarks/bench_startup.py -o after.json
+    python benchmarks/bench_startup.py --backend /path/to/old/checkout/backend -o before.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.abspath(os.path.join(BENCH_DIR, '..', 'backend'))
+
+# Runs in the child interpreter; prints one JSON object of timings in seconds
+CHILD = r'''
+import contextlib, io, json, sys, time
+sys.path.insert(0, sys.argv[1])
+module = sys.argv[2]
+timings = {}
+with contextlib.redirect_stdout(io.StringIO()):
+    launched = started = time.perf_counter()
+    imported = __import__(module)
+    timings['import_' + module] = time.perf_counter() - started
+    if module == 'app':
+        started = time.perf_counter()
+        # Older trees build the app at import time
+        create_app = getattr(imported, 'create_app', None)
+        flask_app = create_app() if create_app else imported.app
+        timings['create_app'] = time.perf_counter() - started
+        client = flask_app.test_client()
+        for name in ('first_request', 'second_request'):
+            started = time.perf_counter()
+            client.get('/get_current_user')
+            timings[name] = time.perf_counter() - started
+            if name == 'first_request':
+                timings['first_response'] = time.perf_counter() - launched
+print(json.dumps(timings))
+'''
+
+
+def git_commit(path):
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=path, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def sample(backend, module, work_dir, env):
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD, backend, module],
+        cwd=work_dir, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    # The last line is ours; anything before it is logging from the backend
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def summarise(times):
+    ordered = sorted(times)
+    return {
+        'iterations': len(ordered),
+        'min': ordered[0],
+        'median': statistics.median(ordered),
+        'p95': ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))],
+        'mean': statistics.fmean(ordered)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--backend', default=BACKEND_DIR, help='backend directory to measure')
+    parser.add_argument('--runs', type=int, default=10, help='fresh interpreters per scenario')
+    parser.add_argument('-o', '--output', default='-', help='results file, or - for stdout')
+    args = parser.parse_args()
+    backend = os.path.abspath(args.backend)
+
+    started = datetime.now(timezone.utc)
+    samples = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        env = dict(os.environ, DB_PATH=os.path.join(tmp_dir, 'startup.db'), LOG_LEVEL='WARNING')
+        for scenario in ('fresh', 'existing'):
+            for _ in range(args.runs):
+                work_dir = os.path.join(tmp_dir, 'work')
+                if scenario == 'fresh':
+                    shutil.rmtree(work_dir, ignore_errors=True)
+                    if os.path.exists(env['DB_PATH']):
+                        os.remove(env['DB_PATH'])
+                os.makedirs(work_dir, exist_ok=True)
+                for module in ('app', 'auth', 'vault'):
+                    for name, seconds in sample(backend, module, work_dir, env).items():
+                        samples.setdefault(f'startup.{scenario}.{name}', []).append(seconds)
+            print(f'{scenario}: {args.runs} runs', file=sys.stderr)
+
+    results = []
+    for name, times in samples.items():
+        stats = summarise(times)
+        results.append({'name': name, 'size': None, **stats})
+        print(f"{name:<40} {stats['median'] * 1000:10.3f} ms", file=sys.stderr)
+
+    report = {
+        'meta': {
+            'commit': git_commit(backend),
+            'started': started.isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'args': vars(args)
+        },
+        'results': results
+    }
+    if args.output == '-':
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
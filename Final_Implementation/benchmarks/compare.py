@@ -0,0 +1,61 @@
+"""
+Compare two bench_hot_paths.py result files.
+
+Prints the median time of every benchmark in both runs and the ratio
+new/old, and exits with status 1 if any benchmark got slower than the
+threshold allows.
+
+    python benchmarks/compare.py before.json after.json --threshold 1.25
+"""
+import argparse
+import json
+import sys
+
+
+def load(path):
+    with open(path) as f:
+        report = json.load(f)
+    return report['meta'], {
+        (result['name'], result['size']): result
+        for result in report['results']
+        if 'skipped' not in result
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('old')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='flag benchmarks whose median grew by more than this factor')
+    parser.add_argument('--metric', default='median', choices=('min', 'median', 'p95', 'mean'))
+    args = parser.parse_args()
+
+    old_meta, old = load(args.old)
+    new_meta, new = load(args.new)
+    print(f"old: {old_meta.get('commit')}  new: {new_meta.get('commit')}  metric: {args.metric}")
+
+    regressions = 0
+    for key in sorted(old.keys() & new.keys(), key=lambda k: (k[0], k[1] or 0)):
+        name, size = key
+        before = old[key][args.metric]
+        after = new[key][args.metric]
+        ratio = after / before if before else float('inf')
+        flag = ''
+        if ratio > args.threshold:
+            flag = '  REGRESSION'
+            regressions += 1
+        elif ratio < 1 / args.threshold:
+            flag = '  faster'
+        print(f'{name:<40} {str(size):>8} {before * 1000:10.3f} ms -> {after * 1000:10.3f} ms  x{ratio:.2f}{flag}')
+
+    for key in sorted(old.keys() ^ new.keys(), key=lambda k: (k[0], k[1] or 0)):
+        print(f"{key[0]:<40} {str(key[1]):>8} only in {'old' if key in old else 'new'}")
+
+    if regressions:
+        print(f'{regressions} benchmark(s) slower than x{args.threshold}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
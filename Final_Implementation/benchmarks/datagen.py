@@ -0,0 +1,91 @@
+"""
+Synthetic data for the benchmarks: N users x M credentials.
+
+Everything is derived from a seed, so two runs (or two commits) build the
+same vaults. Import after the backend directory is on sys.path and the
+working directory points at a scratch location.
+"""
+import csv
+import random
+import string
+from typing import List, Tuple
+
+TLDS = ('com', 'org', 'net', 'io', 'co.uk', 'com.pk')
+
+
+def user_email(index: int) -> str:
+    return f'user{index}@bench.example.com'
+
+
+def user_password(index: int) -> str:
+    return f'password-{index}'
+
+
+def credential_entries(rng: random.Random, count: int) -> List[Tuple[str, str, str]]:
+    """
+    (website_url, username, password) tuples with realistic shapes: a mix
+    of bare domains and subdomains, several accounts on some sites.
+    """
+    entries = []
+    for i in range(count):
+        domain = ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 12)))
+        host = f'{domain}.{rng.choice(TLDS)}'
+        if rng.random() < 0.3:
+            host = f'{rng.choice(("www", "accounts", "login", "app"))}.{host}'
+        username = f'{rng.choice(("alice", "bob", "carol", "dave"))}{i}@mail.example.com'
+        password = ''.join(rng.choices(string.ascii_letters + string.digits, k=16))
+        entries.append((host, username, password))
+    return entries
+
+
+def write_user_data(path: str, users: int) -> None:
+    """
+    Write the Flask app's user_data.csv with users accounts.
+    """
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['email', 'password'])
+        for i in range(users):
+            writer.writerow([user_email(i), user_password(i)])
+
+
+def write_users_csv(path: str, users: int, password_hash: bytes) -> None:
+    """
+    Write auth.py's users.csv with users main accounts sharing one
+    precomputed bcrypt hash (hashing each row would dominate setup).
+    """
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Username', 'Password Hash', 'Name', 'Age', 'Phone', 'Website URL', 'Registration Date'])
+        for i in range(users):
+            writer.writerow([user_email(i), password_hash.decode('utf-8'), '', '', '', '', '2024-01-01 00:00:00'])
+
+
+def populate_vaults(users: int, credentials: int, seed: int = 0, prefix: str = '') -> List[str]:
+    """
+    Create users vault accounts holding credentials entries each and
+    return their emails. Passwords are encrypted in bulk with the
+    production key derivation, so reads exercise the real decrypt path.
+    """
+    import vault
+    from parallel_crypto import create_executor, encrypt_many
+
+    rng = random.Random(seed)
+    executor = create_executor()
+    emails = []
+    try:
+        for i in range(users):
+            email = f'{prefix}{user_email(i)}'
+            user_id = vault.get_or_create_user_id(email)
+            entries = credential_entries(rng, credentials)
+            encrypted = encrypt_many(
+                vault.get_encryption_key(user_id), [password for _, _, password in entries], executor
+            )
+            vault.insert_encrypted_credentials_batch(user_id, [
+                (host, username, token) for (host, username, _), token in zip(entries, encrypted)
+            ])
+            emails.append(email)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return emails
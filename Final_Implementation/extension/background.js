@@ -24,8 +24,15 @@ chrome.runtime.onMessage.addListener((request, sender, sendResponse) => {
     }
 });
 
+// Login state pushed over /events; null while no event stream is open
+let pushedLoginState = null;
+let eventStreamOpen = false;
+
 // Function to check login status
 async function checkLoginStatus() {
+    if (pushedLoginState) {
+        return pushedLoginState;
+    }
     try {
         const response = await fetch('http://localhost:5000/get_current_user', {
             method: 'GET',
@@ -41,6 +48,9 @@ async function checkLoginStatus() {
 
         const data = await response.json();
         console.log('Login status data:', data);
+        if (data.logged_in) {
+            listenForEvents();
+        }
         return {
             logged_in: data.logged_in,
             email: data.email
@@ -54,6 +64,75 @@ async function checkLoginStatus() {
     }
 }
 
+// Keep one server-sent event stream open while logged in, so login checks
+// are answered locally and tabs hear about vault changes without polling.
+// Service workers have no EventSource, so the stream is read with fetch.
+async function listenForEvents() {
+    if (eventStreamOpen) {
+        return;
+    }
+    eventStreamOpen = true;
+    try {
+        const response = await fetch('http://localhost:5000/events', {
+            credentials: 'include',
+            headers: {
+                'Accept': 'text/event-stream'
+            }
+        });
+        if (!response.ok) {
+            return;
+        }
+
+        const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+        let buffer = '';
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) {
+                break;
+            }
+            buffer += value;
+            let end;
+            while ((end = buffer.indexOf('\n\n')) !== -1) {
+                handleServerEvent(buffer.slice(0, end));
+                buffer = buffer.slice(end + 2);
+            }
+        }
+    } catch (error) {
+        console.error('Event stream closed:', error);
+    } finally {
+        // Fall back to asking the server until the stream is reopened
+        eventStreamOpen = false;
+        pushedLoginState = null;
+    }
+}
+
+function handleServerEvent(frame) {
+    let event = 'message';
+    let data = {};
+    frame.split('\n').forEach(line => {
+        if (line.startsWith('event: ')) {
+            event = line.slice('event: '.length);
+        } else if (line.startsWith('data: ')) {
+            data = JSON.parse(line.slice('data: '.length));
+        }
+    });
+
+    if (event === 'ready') {
+        pushedLoginState = { logged_in: true, email: data.email };
+    } else if (event === 'logout') {
+        pushedLoginState = { logged_in: false, email: null };
+    } else if (event === 'vault' || event === 'resync') {
+        chrome.tabs.query({}, tabs => {
+            tabs.forEach(tab => {
+                chrome.tabs.sendMessage(tab.id, { action: 'vaultChanged', version: data.version }, () => {
+                    // Tabs without the content script have no listener
+                    void chrome.runtime.lastError;
+                });
+            });
+        });
+    }
+}
+
 // Listen for messages from content script
 chrome.runtime.onMessage.addListener((message, sender, sendResponse) => {
     if (message.type === 'SAVE_CREDENTIALS') {
@@ -156,37 +235,63 @@ function fillForm(credentials) {
     }
 }
 
+// Tabs that finished loading close together (e.g. a restored session) are
+// looked up with one /get_credentials_batch request
+const AUTOFILL_BATCH_DELAY = 100;
+let pendingAutofillTabs = new Map();
+let autofillBatchTimer = null;
+
 // Listen for tab updates to check if we should autofill
-chrome.tabs.onUpdated.addListener(async (tabId, changeInfo, tab) => {
+chrome.tabs.onUpdated.addListener((tabId, changeInfo, tab) => {
     if (changeInfo.status === 'complete' && tab.url) {
         try {
-            const response = await fetch('http://localhost:5000/get_credentials', {
-                method: 'POST',
-                credentials: 'include',
-                headers: {
-                    'Content-Type': 'application/json',
-                    'Accept': 'application/json'
-                },
-                body: JSON.stringify({ websiteUrl: new URL(tab.url).hostname })
-            });
+            pendingAutofillTabs.set(tabId, new URL(tab.url).hostname);
+        } catch (error) {
+            return;
+        }
+        if (!autofillBatchTimer) {
+            autofillBatchTimer = setTimeout(flushAutofillBatch, AUTOFILL_BATCH_DELAY);
+        }
+    }
+});
 
-            if (!response.ok) {
-                return;
-            }
+async function flushAutofillBatch() {
+    const tabs = pendingAutofillTabs;
+    pendingAutofillTabs = new Map();
+    autofillBatchTimer = null;
 
-            const data = await response.json();
-            if (data.credentials && data.credentials.length > 0) {
+    try {
+        const response = await fetch('http://localhost:5000/get_credentials_batch', {
+            method: 'POST',
+            credentials: 'include',
+            headers: {
+                'Content-Type': 'application/json',
+                'Accept': 'application/json'
+            },
+            body: JSON.stringify({ websiteUrls: [...new Set(tabs.values())] })
+        });
+
+        if (!response.ok) {
+            return;
+        }
+
+        const data = await response.json();
+        tabs.forEach((hostname, tabId) => {
+            // Entries saved for a sibling subdomain are only offered from the
+            // popup, never filled in without the user picking them
+            const credential = (data.results[hostname] || []).find(c => c.match !== 'sibling');
+            if (credential) {
                 // Send message to content script to autofill
                 chrome.tabs.sendMessage(tabId, {
                     action: 'autofill',
-                    credentials: data.credentials[0]
+                    credentials: credential
                 });
             }
-        } catch (error) {
-            console.error('Error checking for autofill:', error);
-        }
+        });
+    } catch (error) {
+        console.error('Error checking for autofill:', error);
     }
-});
+}
 
 // Listen for extension installation
 chrome.runtime.onInstalled.addListener(() => {
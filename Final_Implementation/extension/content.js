@@ -1,6 +1,8 @@
 // Add at the top of the file, after the existing code
 let credentialsCache = null;
+let credentialsCacheUrl = null;
 let lastCredentialsFetch = 0;
+let vaultVersion = null; // vault version the cache reflects, for /sync
 const CREDENTIALS_CACHE_DURATION = 30000; // 30 seconds
 let isExtensionValid = true;
 let retryCount = 0;
@@ -323,16 +325,27 @@ function createCredentialsDropdown(credentials, passwordInput) {
         const displayEmail = cred.email || cred.username;
         item.innerHTML = `
             <div style="flex: 1;">
-                <div style="font-weight: 500; color: #333;">${displayEmail}</div>
-                <div style="font-size: 12px; color: #666;">${window.location.hostname}</div>
+                <div style="font-weight: 500; color: #333;"></div>
+                <div style="font-size: 12px; color: #666;"></div>
             </div>
         `;
+        // Stored values are set as text, never parsed as markup in the page
+        const [emailLine, websiteLine] = item.querySelectorAll(':scope > div > div');
+        emailLine.textContent = displayEmail;
+        websiteLine.textContent = cred.websiteUrl || window.location.hostname;
 
-        item.addEventListener('click', (e) => {
+        item.addEventListener('click', async (e) => {
             console.log('Credential selected:', cred);
             e.preventDefault();
             e.stopPropagation();
             
+            // Only the selected entry is decrypted by the server
+            const password = await revealCredential(window.location.hostname, cred.id);
+            if (password === null) {
+                dropdown.remove();
+                return;
+            }
+            
             // Find the username input in the same form
             const form = passwordInput.form;
             const usernameInput = form.querySelector('input[type="email"], input[type="text"][name*="user"], input[type="text"][name*="email"], input[type="text"][name*="login"], input[type="text"]');
@@ -342,7 +355,7 @@ function createCredentialsDropdown(credentials, passwordInput) {
                 usernameInput.value = displayEmail;
                 usernameInput.dispatchEvent(new Event('input', { bubbles: true }));
             }
-            passwordInput.value = cred.password;
+            passwordInput.value = password;
             passwordInput.dispatchEvent(new Event('input', { bubbles: true }));
             
             dropdown.remove();
@@ -382,13 +395,21 @@ async function getCredentials(websiteUrl) {
     try {
         const now = Date.now();
         // Use cached credentials if available and not expired
-        if (credentialsCache && (now - lastCredentialsFetch) < CREDENTIALS_CACHE_DURATION) {
-            console.log('Using cached credentials');
-            return credentialsCache;
+        if (credentialsCache && credentialsCacheUrl === websiteUrl) {
+            if ((now - lastCredentialsFetch) < CREDENTIALS_CACHE_DURATION) {
+                console.log('Using cached credentials');
+                return credentialsCache;
+            }
+            // Expired: keep the cache if the vault hasn't changed since
+            if (await vaultUnchanged()) {
+                lastCredentialsFetch = now;
+                return credentialsCache;
+            }
         }
 
         console.log('Fetching fresh credentials for:', websiteUrl);
-        const response = await fetch('http://localhost:5000/get_credentials', {
+        // Usernames only; passwords are revealed one at a time on selection
+        const response = await fetch('http://localhost:5000/list_credentials', {
             method: 'POST',
             credentials: 'include',
             headers: {
@@ -413,7 +434,9 @@ async function getCredentials(websiteUrl) {
         
         // Update cache
         credentialsCache = data.credentials;
+        credentialsCacheUrl = websiteUrl;
         lastCredentialsFetch = now;
+        vaultVersion = data.version ?? null;
         
         console.log('Retrieved credentials:', data);
         return data.credentials;
@@ -423,6 +446,71 @@ async function getCredentials(websiteUrl) {
     }
 }
 
+// Ask the server for changes since the cached version; an empty answer means the cache is current
+async function vaultUnchanged() {
+    if (vaultVersion === null) {
+        return false;
+    }
+    try {
+        const response = await fetch(`http://localhost:5000/sync?since=${vaultVersion}`, {
+            credentials: 'include',
+            headers: {
+                'Accept': 'application/json'
+            }
+        });
+        if (!response.ok) {
+            return false;
+        }
+        
+        const data = await response.json();
+        if (data.full || data.changes.length > 0) {
+            return false;
+        }
+        vaultVersion = data.version;
+        return true;
+    } catch (error) {
+        console.error('Error syncing vault:', error);
+        return false;
+    }
+}
+
+// The background script relays vault changes pushed by the server
+chrome.runtime.onMessage.addListener((message) => {
+    if (message.action === 'vaultChanged') {
+        credentialsCache = null;
+        vaultVersion = null;
+    }
+});
+
+// Function to decrypt the password of a single selected credential
+async function revealCredential(websiteUrl, id) {
+    try {
+        const response = await fetch('http://localhost:5000/reveal_credential', {
+            method: 'POST',
+            credentials: 'include',
+            headers: {
+                'Content-Type': 'application/json',
+                'Accept': 'application/json'
+            },
+            body: JSON.stringify({
+                websiteUrl: websiteUrl,
+                id: id
+            })
+        });
+        
+        if (!response.ok) {
+            console.log('Could not reveal credential:', response.status);
+            return null;
+        }
+        
+        const data = await response.json();
+        return data.password;
+    } catch (error) {
+        console.error('Error revealing credential:', error);
+        return null;
+    }
+}
+
 // Function to handle autofill
 async function handleAutofill() {
     try {
@@ -0,0 +1,29 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+
+# Backend modules read their settings and open the database on import, so
+# point them at a scratch directory before any test module imports them
+_data_dir = tempfile.mkdtemp(prefix='pm-tests-')
+os.environ.update({
+    'DB_PATH': os.path.join(_data_dir, 'test.db'),
+    'CHANGE_LOG_RETENTION': '5',
+    'VAULT_KDF_N': '1024',
+    'BCRYPT_ROUNDS': '4'
+})
+os.chdir(_data_dir)
+sys.path.insert(0, os.path.abspath(BACKEND_DIR))
+
+
+@pytest.fixture(scope='session')
+def storage():
+    import auth
+    import vault
+
+    auth.init_db()
+    vault.init_vault()
+    return vault
@@ -0,0 +1,68 @@
+import pytest
+
+
+@pytest.fixture
+def store(storage):
+    import credential_store
+    return credential_store
+
+
+def test_bloom_filter_has_no_false_negatives():
+    from credential_store import BloomFilter
+
+    bloom = BloomFilter(100)
+    items = [f'site{i}.example' for i in range(100)]
+    for item in items:
+        bloom.add(item)
+    assert all(item in bloom for item in items)
+    assert sum(f'other{i}.example' in bloom for i in range(1000)) < 50
+
+
+def test_unsaved_domain_is_filtered(store):
+    email = 'bloom-filtered@example.com'
+    store.add_credentials(email, 'accounts.example.com', 'alice', 'pw')
+    before = store.filter_stats()['filtered']
+
+    assert store.find_credentials(email, 'unrelated.org') == []
+    assert store.filter_stats()['filtered'] == before + 1
+    # Any host under a saved registrable domain passes the filter
+    assert [row['website_url'] for row in store.find_credentials(email, 'login.example.com')] == [
+        'accounts.example.com'
+    ]
+
+
+def test_deleted_domain_misses_until_rebuild(store):
+    email = 'bloom-deleted@example.com'
+    store.add_credentials(email, 'keep.com', 'alice', 'pw')
+    store.add_credentials(email, 'gone.com', 'bob', 'pw')
+    row = store.find_credentials(email, 'gone.com')[0]
+    assert store.delete_credentials(email, 'gone.com', row['id'])
+
+    # Still in the filter, so the lookup reaches the trie and finds nothing
+    assert store.find_credentials(email, 'gone.com') == []
+    assert 'gone.com' in store._get_index(email).hosts
+
+    store.invalidate(email)
+    index = store._get_index(email)
+    assert 'gone.com' not in index.hosts
+    assert 'keep.com' in index.hosts
+    assert store.find_credentials(email, 'gone.com') == []
+
+
+def test_search_sees_writes_and_reloads(store, storage):
+    email = 'search@example.com'
+    store.add_credentials(email, 'github.com', 'octocat', 'pw')
+    assert store.search_credentials(email, 'git')[0] == 1
+
+    store.add_credentials(email, 'gitlab.com', 'me', 'pw')
+    search = store._get_index(email).search
+    total, rows = store.search_credentials(email, 'git')
+    assert total == 2
+    assert [row['website_url'] for row in rows] == ['github.com', 'gitlab.com']
+
+    # A write from another process: the reloaded index keeps the search
+    # index and only adds the new entry
+    user_id = store.get_user_id(email)
+    storage.insert_encrypted_credentials(user_id, 'gitea.com', 'other', storage.encrypt_password('pw', user_id))
+    assert store._get_index(email).search is search
+    assert [row['website_url'] for row in store.search_credentials(email, 'gite')[1]] == ['gitea.com']
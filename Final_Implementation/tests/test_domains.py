@@ -0,0 +1,55 @@
+from domains import PARENT, SIBLING, SUBDOMAIN, EXACT, DomainTrie, PublicSuffixList, registrable_domain
+
+
+def test_wildcard_and_exception_rules():
+    psl = PublicSuffixList({'ck', 'jp', 'kawasaki.jp'}, {'ck', 'kawasaki.jp'}, {'www.ck', 'city.kawasaki.jp'})
+    # "*.ck": every label under ck is a suffix...
+    assert psl.suffix_length(['shop', 'foo', 'ck']) == 2
+    # ...except "!www.ck", which is registrable itself
+    assert psl.suffix_length(['a', 'www', 'ck']) == 1
+    assert psl.suffix_length(['x', 'foo', 'kawasaki', 'jp']) == 3
+    assert psl.suffix_length(['x', 'city', 'kawasaki', 'jp']) == 2
+    # No rule: not a suffix at all
+    assert psl.suffix_length(['example', 'invalid']) == 0
+
+
+def test_registrable_domain_with_bundled_list():
+    assert registrable_domain('accounts.example.co.uk') == 'example.co.uk'
+    assert registrable_domain('shop.foo.ck') == 'shop.foo.ck'
+    assert registrable_domain('a.www.ck') == 'www.ck'
+    assert registrable_domain('x.city.kawasaki.jp') == 'city.kawasaki.jp'
+
+
+def test_private_suffix_keeps_sites_apart():
+    trie = DomainTrie(['a.github.io'])
+    assert trie.match('b.github.io') == []
+    assert trie.match('a.github.io') == [('a.github.io', EXACT)]
+    assert trie.match('docs.a.github.io') == [('a.github.io', PARENT)]
+
+
+def test_public_suffix_only_matches_itself():
+    trie = DomainTrie(['co.uk', 'example.co.uk'])
+    assert trie.match('co.uk') == [('co.uk', EXACT)]
+    assert trie.match('other.co.uk') == []
+
+
+def test_match_ranking():
+    trie = DomainTrie([
+        'example.com',
+        'accounts.example.com',
+        'login.accounts.example.com',
+        'mail.example.com',
+        'example.org'
+    ])
+    assert trie.match('accounts.example.com') == [
+        ('accounts.example.com', EXACT),
+        ('example.com', PARENT),
+        ('login.accounts.example.com', SUBDOMAIN),
+        ('mail.example.com', SIBLING)
+    ]
+    # Closest parent first
+    assert [host for host, kind in trie.match('a.login.accounts.example.com') if kind == PARENT] == [
+        'login.accounts.example.com',
+        'accounts.example.com',
+        'example.com'
+    ]
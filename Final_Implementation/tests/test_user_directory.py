@@ -0,0 +1,55 @@
+import csv
+import logging
+
+import pytest
+
+from user_directory import UserDirectory
+
+FIELDS = ['email', 'password']
+
+
+@pytest.fixture
+def users_file(tmp_path):
+    path = tmp_path / 'users.csv'
+    with open(path, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerow({'email': 'Alice@example.com', 'password': 'hash-1'})
+        writer.writerow({'email': 'alice@example.com', 'password': 'hash-2'})
+        writer.writerow({'email': 'bob@example.com', 'password': 'hash-3'})
+    return str(path)
+
+
+def read_passwords(path):
+    with open(path, newline='') as file:
+        return {row['email']: row['password'] for row in csv.DictReader(file)}
+
+
+def test_case_variants_resolve_to_their_own_rows(users_file, caplog):
+    with caplog.at_level(logging.WARNING, logger='pm.users'):
+        users = UserDirectory(users_file, 'email', FIELDS)
+        assert users.get('Alice@example.com')['password'] == 'hash-1'
+    assert users.get('alice@example.com')['password'] == 'hash-2'
+    # Other spellings fall back to the first row
+    assert users.get(' ALICE@example.com ')['password'] == 'hash-1'
+    assert users.stats()['case_collisions'] == 1
+    assert "'alice@example.com'" in caplog.text
+
+
+def test_update_changes_only_the_resolved_row(users_file):
+    users = UserDirectory(users_file, 'email', FIELDS)
+    assert users.update('alice@example.com', {'password': 'new'})
+    assert read_passwords(users_file) == {
+        'Alice@example.com': 'hash-1',
+        'alice@example.com': 'new',
+        'bob@example.com': 'hash-3'
+    }
+    assert users.get('alice@example.com')['password'] == 'new'
+    assert not users.update('carol@example.com', {'password': 'new'})
+
+
+def test_add_refuses_new_case_variant(users_file):
+    users = UserDirectory(users_file, 'email', FIELDS)
+    assert not users.add('BOB@example.com', {'email': 'BOB@example.com', 'password': 'x'})
+    assert users.add('carol@example.com', {'email': 'carol@example.com', 'password': 'x'})
+    assert users.get('Carol@Example.com')['password'] == 'x'
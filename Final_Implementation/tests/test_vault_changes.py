@@ -0,0 +1,69 @@
+import pytest
+
+import vault
+
+
+@pytest.fixture
+def user_id(storage, request):
+    return vault.get_or_create_user_id(f'{request.node.name}@example.com')
+
+
+def add(user_id, count, start=0):
+    return [
+        vault.insert_encrypted_credentials(user_id, f'site{i}.com', f'user{i}', 'token')
+        for i in range(start, start + count)
+    ]
+
+
+def test_changes_since_returns_latest_op_per_entry(user_id):
+    first, second, third = add(user_id, 3)
+    vault.delete_credential_row(user_id, second)
+    vault.update_encrypted_password(user_id, third, 'other')
+
+    result = vault.get_changes_since(user_id, 1)
+    assert result['version'] == 5
+    assert not result['full']
+    assert result['changes'] == [
+        {'op': 'delete', 'id': second},
+        {'op': 'put', 'id': third, 'websiteUrl': 'site2.com', 'username': 'user2'}
+    ]
+    assert vault.get_changes_since(user_id, 5) == {'version': 5, 'full': False, 'changes': []}
+
+
+def test_change_log_keeps_retention_versions(user_id):
+    add(user_id, 3 * vault.CHANGE_LOG_RETENTION)
+    conn = vault.get_db_connection()
+    try:
+        versions = [row['version'] for row in conn.execute(
+            'SELECT version FROM credential_changes WHERE user_id = ? ORDER BY version', (user_id,)
+        )]
+    finally:
+        conn.close()
+    latest = 3 * vault.CHANGE_LOG_RETENTION
+    assert versions == list(range(latest - vault.CHANGE_LOG_RETENTION + 1, latest + 1))
+
+
+def test_snapshot_when_since_predates_log(user_id):
+    ids = add(user_id, 3 * vault.CHANGE_LOG_RETENTION)
+    version = len(ids)
+    oldest = version - vault.CHANGE_LOG_RETENTION + 1
+
+    # The log still covers everything after oldest - 1...
+    result = vault.get_changes_since(user_id, oldest - 1)
+    assert not result['full']
+    assert len(result['changes']) == vault.CHANGE_LOG_RETENTION
+
+    # ...but not what happened just before it
+    result = vault.get_changes_since(user_id, oldest - 2)
+    assert result['full']
+    assert result['version'] == version
+    assert [cred['id'] for cred in result['credentials']] == ids
+    assert 'password' not in result['credentials'][0]
+
+
+def test_snapshot_when_since_is_ahead(user_id):
+    add(user_id, 2)
+    result = vault.get_changes_since(user_id, 3)
+    assert result['full']
+    assert result['version'] == 2
+    assert len(result['credentials']) == 2
@@ -26,4 +26,11 @@ def create_app():
     from app.routes import main_bp
     app.register_blueprint(main_bp)
 
+    # Shed login/registration load instead of queueing it behind the hashing pool
+    from app.hashing import HashingOverloaded
+
+    @app.errorhandler(HashingOverloaded)
+    def hashing_overloaded(error):
+        return 'Server is busy, please try again shortly.', 503, {'Retry-After': '1'}
+
     return app
@@ -63,6 +63,10 @@ def login():
             flash('Invalid username or password.', 'danger')
             return redirect(url_for('auth.login'))
 
+        # Upgrade the stored hash if it was made at a different cost
+        if user.rehash_if_needed(password):
+            db.session.commit()
+
         # Store user id in session upon successful login
         session['user_id'] = user.id
         flash('Login successful!', 'success')
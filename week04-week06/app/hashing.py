@@ -0,0 +1,132 @@
+# app/hashing.py
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import generate_password_hash
+
+HASH_WORKERS = int(os.getenv('HASH_WORKERS', str(max(1, (os.cpu_count() or 2) // 2))))
+HASH_QUEUE_LIMIT = int(os.getenv('HASH_QUEUE_LIMIT', '32'))
+HASH_TIMEOUT_SECONDS = float(os.getenv('HASH_TIMEOUT_SECONDS', '10'))
+
+# Target time for one password hash; PBKDF2_ITERATIONS skips calibration
+HASH_TARGET_MS = float(os.getenv('HASH_TARGET_MS', '250'))
+# Hashes estimated outside target * [low, high] are replaced on login
+HASH_TARGET_BAND = (
+    float(os.getenv('HASH_TARGET_BAND_LOW', '0.5')),
+    float(os.getenv('HASH_TARGET_BAND_HIGH', '2.0'))
+)
+CALIBRATION_ITERATIONS = 100000
+
+
+class HashingOverloaded(Exception):
+    """Raised when too many password hashes are already queued."""
+
+
+class HashingPool:
+    """
+    Runs werkzeug password hashing on a small, capped set of threads.
+
+    Hashing work never uses more than `max_workers` threads, and at most
+    `max_queue` calls wait behind them; extra calls are rejected right
+    away with HashingOverloaded so the request can be answered with 503.
+    """
+
+    def __init__(self, max_workers=HASH_WORKERS, max_queue=HASH_QUEUE_LIMIT):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='hashing')
+        self.slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.rejected = 0
+        self.completed = 0
+        self.latencies = deque(maxlen=1024)
+
+    def run(self, fn, *args):
+        if not self.slots.acquire(blocking=False):
+            with self.lock:
+                self.rejected += 1
+            raise HashingOverloaded('Password hashing queue is full')
+
+        submitted = time.perf_counter()
+        with self.lock:
+            self.pending += 1
+
+        def done(_):
+            with self.lock:
+                self.pending -= 1
+                self.completed += 1
+                self.latencies.append(time.perf_counter() - submitted)
+            self.slots.release()
+
+        future = self.executor.submit(fn, *args)
+        future.add_done_callback(done)
+        return future.result(timeout=HASH_TIMEOUT_SECONDS)
+
+    def stats(self):
+        with self.lock:
+            latencies = sorted(self.latencies)
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))] if latencies else 0.0
+
+        return {
+            'max_workers': self.max_workers,
+            'max_queue': self.max_queue,
+            'pending': self.pending,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'latency_p50': percentile(0.50),
+            'latency_p95': percentile(0.95),
+            'latency_max': latencies[-1] if latencies else 0.0
+        }
+
+
+pool = HashingPool()
+
+
+_iterations = None
+_iterations_lock = threading.Lock()
+
+
+def calibrate_pbkdf2_iterations(target_ms=HASH_TARGET_MS):
+    """Time a PBKDF2-SHA256 hash and scale the iteration count to target_ms."""
+    started = time.perf_counter()
+    generate_password_hash('calibration-password', method=f'pbkdf2:sha256:{CALIBRATION_ITERATIONS}')
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    # PBKDF2 cost is linear in the iteration count
+    return max(CALIBRATION_ITERATIONS, int(CALIBRATION_ITERATIONS * target_ms / elapsed_ms))
+
+
+def pbkdf2_iterations():
+    global _iterations
+    if _iterations is None:
+        with _iterations_lock:
+            if _iterations is None:
+                configured = os.getenv('PBKDF2_ITERATIONS')
+                _iterations = int(configured) if configured else pool.run(calibrate_pbkdf2_iterations)
+    return _iterations
+
+
+def password_method():
+    """Werkzeug method string for new hashes, e.g. 'pbkdf2:sha256:870000'."""
+    return f'pbkdf2:sha256:{pbkdf2_iterations()}'
+
+
+def needs_rehash(password_hash):
+    """
+    Check whether a stored hash should be replaced with one at the
+    calibrated cost. Werkzeug hashes start with their method
+    ('pbkdf2:sha256:600000$...'); anything other than PBKDF2-SHA256,
+    or an iteration count outside the target band, needs a rehash.
+    """
+    method = password_hash.split('$', 1)[0].split(':')
+    if method[:2] != ['pbkdf2', 'sha256'] or len(method) != 3 or not method[2].isdigit():
+        return True
+    ratio = int(method[2]) / pbkdf2_iterations()
+    low, high = HASH_TARGET_BAND
+    return not (low <= ratio <= high)
@@ -1,6 +1,7 @@
 # app/models.py
 
 from app import db
+from app.hashing import needs_rehash, password_method, pool as hashing_pool
 from werkzeug.security import generate_password_hash, check_password_hash
 
 class User(db.Model):
@@ -10,7 +11,14 @@ class User(db.Model):
     password_hash = db.Column(db.String(128), nullable=False)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hashing_pool.run(generate_password_hash, password, password_method())
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return hashing_pool.run(check_password_hash, self.password_hash, password)
+
+    def rehash_if_needed(self, password):
+        # Call after a successful check_password; the caller commits
+        if needs_rehash(self.password_hash):
+            self.set_password(password)
+            return True
+        return False
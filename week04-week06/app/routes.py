@@ -44,6 +44,8 @@ def login():
         user = User.query.filter_by(username=username).first()
 
         if user and user.check_password(password):
+            if user.rehash_if_needed(password):
+                db.session.commit()
             return redirect(url_for('main.dashboard'))  # Redirect to dashboard on success
         else:
             flash('Invalid username or password. Please try again.', 'danger')
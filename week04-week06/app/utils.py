@@ -1,9 +1,10 @@
 from werkzeug.security import generate_password_hash, check_password_hash
+from app.hashing import password_method, pool as hashing_pool
 
 # Function to hash the password
 def hash_password(password):
-    return generate_password_hash(password)
+    return hashing_pool.run(generate_password_hash, password, password_method())
 
 # Function to check the hashed password with the stored hash
 def check_password(stored_hash, password):
-    return check_password_hash(stored_hash, password)
+    return hashing_pool.run(check_password_hash, stored_hash, password)